@@ -1,7 +1,75 @@
+import json
+import math
+
+from .chat import token_usage
+from bargain_langgraph.profiling import phase
+"""
+Base agent and the shared handling of LLM turns
+An agent's llm is either a chat model or a router with an invoke_action method
+(see cascade.py); invoke_llm hides the difference.
+"""
+
+ACTIONS = ("offer", "accept", "ponder", "chitchat", "breakdown")
+
 class Agent:
     def act(self, state: dict) -> dict:
         """
         Given the current state, return an action:
         {"type": "accept"} or {"type": "offer", "price": float}
         """
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+
+def parse_llm_output(chat_resp) -> dict:
+    parsed = json.loads(chat_resp.content)
+
+    if not isinstance(parsed, dict):
+        raise TypeError("LLM output must be a dict")
+
+    if "action" not in parsed or "message" not in parsed or "price" not in parsed:
+        raise ValueError(f"Malformed LLM output: {parsed}")
+
+    return parsed
+
+
+def price_violation(action, state, role):
+    # reason the action breaks the bargaining rules for role, None if it does not
+    if action["action"] not in ACTIONS:
+        return f"unknown action {action['action']!r}"
+    if action["action"] != "offer":
+        return None
+    # the transitions apply float() to the price, so numeric strings are fine
+    try:
+        price = math.nan if isinstance(action["price"], bool) else float(action["price"])
+    except (TypeError, ValueError):
+        price = math.nan
+    if not math.isfinite(price) or price <= 0:
+        return f"offer without a valid price ({action['price']!r})"
+    if role == "buyer":
+        if price > state["buyer_cost"]:
+            return "buyer offer above buyer cost"
+        if state["current_seller_offer"] is not None and price > state["current_seller_offer"]:
+            return "buyer offer above the seller's offer"
+    else:
+        if price < state["seller_cost"]:
+            return "seller offer below seller cost"
+        if state["current_buyer_offer"] is not None and price < state["current_buyer_offer"]:
+            return "seller offer below the buyer's offer"
+    return None
+
+
+def usage_record(state, role, messages, chat_resp) -> dict:
+    return {"round": state["round"], "role": role, "messages": len(messages), **token_usage(chat_resp)}
+
+
+def invoke_llm(llm, messages, state, role, usage_log=None) -> dict:
+    # one LLM turn for role ("buyer" / "seller"), returns the parsed action
+    # usage_log: optional list, gets the token usage of every call
+    if hasattr(llm, "invoke_action"):
+        return llm.invoke_action(messages, state, role, usage_log)
+    with phase("call"):
+        chat_resp = llm.invoke(messages)
+    if usage_log is not None:
+        usage_log.append(usage_record(state, role, messages, chat_resp))
+    with phase("parse"):
+        return parse_llm_output(chat_resp)
@@ -1,5 +1,6 @@
-import json
-from .base import Agent
+from .base import Agent, invoke_llm
+from .chat import build_chat_messages
+from bargain_langgraph.profiling import phase
 """
 Describes the buyer agent and how this agent acts
 Written by: Sunrit Chakraborty
@@ -28,9 +29,14 @@ def buyer_emotion_discount_choice(state,
     return (state["buyer_emotion"], state["buyer_discount"])
 
 class BuyerAgent(Agent):
-    def __init__(self, llm, prompt_template: str):
+    def __init__(self, llm, prompt_template: str, turn_template: str = None, usage_log=None):
+        # turn_template: if given, chat prompt mode (see chat.py); prompt_template is then
+        # the system template (e.g. buyer_system.txt) and turn_template e.g. buyer_turn.txt
+        # usage_log: optional list, gets the token usage of every LLM call
         self.llm = llm
         self.prompt = prompt_template
+        self.turn_prompt = turn_template
+        self.usage_log = usage_log
 
     def act(self, state) -> tuple[dict, tuple, tuple]:
 
@@ -51,23 +57,19 @@ class BuyerAgent(Agent):
         new_state["buyer_emotion"] = buyer_emotion
         new_state["buyer_discount"] = buyer_discount
 
-        prompt_text = self.prompt.format(**new_state)
-
         # Build messages
-        messages = [
-            {"role": "system", "content": "You are a buyer agent in a bargaining simulation."},
-            {"role": "user", "content": prompt_text}
-        ]
+        with phase("render"):
+            if self.turn_prompt is not None:
+                messages = build_chat_messages(self.prompt, self.turn_prompt, new_state, "buyer")
+            else:
+                prompt_text = self.prompt.format(**new_state)
+                messages = [
+                    {"role": "system", "content": "You are a buyer agent in a bargaining simulation."},
+                    {"role": "user", "content": prompt_text}
+                ]
 
         # Call the LLM
-        chat_resp = self.llm.invoke(messages)
-        parsed = json.loads(chat_resp.content)
-
-        if not isinstance(parsed, dict):
-            raise TypeError("LLM output must be a dict")
-
-        if "action" not in parsed or "message" not in parsed or "price" not in parsed:
-            raise ValueError(f"Malformed LLM output: {parsed}")
+        parsed = invoke_llm(self.llm, messages, new_state, "buyer", self.usage_log)
 
         return (parsed,
                 inference,
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from collections import Counter
+
+from .base import parse_llm_output, price_violation, usage_record
+from .chat import token_usage
+from bargain_langgraph.profiling import phase
+"""
+Model cascade: route each agent turn to a cheap or a strong model
+
+Pass a ModelCascade as the llm of BuyerAgent / SellerAgent. Turns go to the
+cheap model unless the policy says the turn is decisive:
+- small_gap: both offers are on the table and within gap_pct of each other
+  (relative to the seller's offer)
+- end_of_horizon: at most rounds_left rounds remain
+A cheap answer that cannot be parsed (invalid_output) or breaks the price rules
+of price_violation (price_constraint) is retried on the strong model, except in
+mode "cheap", which never calls it. The answer that is kept is used as is, and
+errors propagate as without a cascade.
+
+Every turn is logged in self.decisions (and appended to log_path as jsonl):
+round, role, final tier, reason, and latency / tokens of each call made.
+"""
+
+DEFAULT_POLICY = {
+    "mode": "cascade",           # "cascade", or "cheap" / "strong" to send every turn to one model
+    "gap_pct": 0.05,             # escalate when |seller offer - buyer offer| <= gap_pct * seller offer
+    "rounds_left": 2,            # escalate when max_rounds - round <= rounds_left
+    "on_invalid": True,          # retry unparsable cheap output on the strong model (not in mode "cheap")
+    "on_price_constraint": True, # retry cheap offers that break price rules on the strong model (not in mode "cheap")
+}
+
+
+def escalation_reason(state, policy):
+    # reason to skip the cheap model for this turn, None for a routine turn
+    if policy["mode"] == "strong":
+        return "strong_only"
+    if policy["mode"] == "cheap":
+        return None
+    if state["max_rounds"] - state["round"] <= policy["rounds_left"]:
+        return "end_of_horizon"
+    buyer_offer = state["current_buyer_offer"]
+    seller_offer = state["current_seller_offer"]
+    if buyer_offer is not None and seller_offer:
+        if abs(seller_offer - buyer_offer) <= policy["gap_pct"] * seller_offer:
+            return "small_gap"
+    return None
+
+
+class ModelCascade:
+    def __init__(self, cheap_llm, strong_llm, policy=None, log_path=None, prices=None):
+        # policy: overrides of DEFAULT_POLICY
+        # prices: {"cheap": (input, output), "strong": (input, output)} in $ per 1M tokens
+        self.llms = {"cheap": cheap_llm, "strong": strong_llm}
+        self.policy = {**DEFAULT_POLICY, **(policy or {})}
+        if self.policy["mode"] not in ("cascade", "cheap", "strong"):
+            raise ValueError(f"Unknown cascade mode '{self.policy['mode']}'")
+        self.log_path = log_path
+        self.prices = prices
+        self.decisions = []
+        self.lock = threading.Lock()
+
+    def call(self, tier, messages, state, role, usage_log):
+        start = time.perf_counter()
+        with phase("call"):
+            chat_resp = self.llms[tier].invoke(messages)
+        record = {"tier": tier, "latency": time.perf_counter() - start, **token_usage(chat_resp)}
+        if usage_log is not None:
+            usage_log.append({**usage_record(state, role, messages, chat_resp), "tier": tier})
+        return chat_resp, record
+
+    def invoke_action(self, messages, state, role, usage_log=None) -> dict:
+        calls = []
+        reason = escalation_reason(state, self.policy)
+        if reason is None:
+            chat_resp, record = self.call("cheap", messages, state, role, usage_log)
+            calls.append(record)
+            try:
+                with phase("parse"):
+                    parsed = parse_llm_output(chat_resp)
+            except (ValueError, TypeError) as e:
+                record["error"] = str(e)
+                reason = "invalid_output"
+            else:
+                violation = price_violation(parsed, state, role)
+                if violation is not None:
+                    record["error"] = violation
+                    reason = "price_constraint"
+            if reason is None or self.policy["mode"] == "cheap" \
+                    or (reason == "invalid_output" and not self.policy["on_invalid"]) \
+                    or (reason == "price_constraint" and not self.policy["on_price_constraint"]):
+                self.log(state, role, "cheap", reason or "routine", calls)
+                if reason == "invalid_output":
+                    return parse_llm_output(chat_resp)
+                return parsed
+
+        chat_resp, record = self.call("strong", messages, state, role, usage_log)
+        calls.append(record)
+        self.log(state, role, "strong", reason, calls)
+        with phase("parse"):
+            return parse_llm_output(chat_resp)
+
+    def log(self, state, role, tier, reason, calls):
+        decision = {
+            "round": state["round"],
+            "role": role,
+            "tier": tier,
+            "reason": reason,
+            "latency": sum(c["latency"] for c in calls),
+            "calls": calls,
+        }
+        with self.lock:
+            self.decisions.append(decision)
+            if self.log_path is not None:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(decision) + "\n")
+
+    def summary(self) -> dict:
+        with self.lock:
+            decisions = list(self.decisions)
+        tokens = {tier: {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+                  for tier in self.llms}
+        for decision in decisions:
+            for c in decision["calls"]:
+                tokens[c["tier"]]["calls"] += 1
+                for key in ("input_tokens", "cached_tokens", "output_tokens"):
+                    tokens[c["tier"]][key] += c[key]
+
+        n = len(decisions)
+        summary = {
+            "turns": n,
+            "strong_share": sum(d["tier"] == "strong" for d in decisions) / n if n else None,
+            "reasons": dict(Counter(d["reason"] for d in decisions)),
+            "mean_turn_latency": sum(d["latency"] for d in decisions) / n if n else None,
+            "tokens": tokens,
+        }
+        if self.prices is not None:
+            summary["cost"] = sum((t["input_tokens"] * self.prices[tier][0]
+                                   + t["output_tokens"] * self.prices[tier][1]) / 1e6
+                                  for tier, t in tokens.items())
+        return summary
@@ -0,0 +1,102 @@
+import json
+import string
+from functools import lru_cache
+
+from bargain_langgraph.dynamics.transitions import flatten_history
+"""
+Chat prompt mode: a stable system prefix plus incremental turn messages
+
+In the single-message mode the whole template (persona, product, rules and the
+per-turn state) is rendered into one user message every turn, so no two
+prompts share a prefix. In chat mode (BuyerAgent / SellerAgent with a
+turn_template) the prompt of role's turn is
+
+    system:    system template; only static fields (persona, product, costs,
+               initial offer), rendered once per episode
+    assistant: role's earlier replies, as the JSON it returned
+    user:      the other side's messages in between
+    ...
+    user:      the other side's latest message(s) + turn template (round,
+               offers, demand / supply, emotion, discount, inference)
+
+Everything but the last message is rebuilt from history byte-for-byte, so a
+turn's prompt starts with all of the previous turn's prompt except its last
+message, and provider prompt caching (or a local KV-prefix cache) can reuse it.
+
+token_usage reads cached / uncached prompt tokens from the response, and
+usage_summary aggregates the usage_log kept by the agents.
+"""
+
+@lru_cache(maxsize=64)
+def template_fields(template):
+    return tuple(sorted({field for _, field, _, _ in string.Formatter().parse(template) if field}))
+
+
+@lru_cache(maxsize=4096)
+def _render(template, values):
+    return template.format(**dict(zip(template_fields(template), values)))
+
+
+def render_system(template, state):
+    # cached on the fields the template uses: one rendering per episode
+    return _render(template, tuple(state[field] for field in template_fields(template)))
+
+
+def opponent_line(turn):
+    price = f" ${turn['price']}" if turn["action"] == "offer" and turn["price"] is not None else ""
+    return f"{turn['role'].capitalize()} ({turn['action']}{price}): {turn['message']}"
+
+
+def own_reply(turn):
+    return json.dumps({"action": turn["action"], "price": turn["price"], "message": turn["message"]})
+
+
+def build_chat_messages(system_template, turn_template, state, role) -> list[dict]:
+    messages = [{"role": "system", "content": render_system(system_template, state)}]
+    pending = []
+    for turn in flatten_history(state["history"]):
+        if turn["role"] == role:
+            if pending:
+                messages.append({"role": "user", "content": "\n".join(pending)})
+                pending = []
+            messages.append({"role": "assistant", "content": own_reply(turn)})
+        else:
+            pending.append(opponent_line(turn))
+    pending.append(turn_template.format(**state))
+    messages.append({"role": "user", "content": "\n\n".join(pending)})
+    return messages
+
+
+# -------------------------
+# Token usage
+# -------------------------
+def token_usage(chat_resp) -> dict:
+    # prompt / cached / output tokens from a LangChain chat response (0 if not reported)
+    usage = getattr(chat_resp, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens", 0)
+    cached = (usage.get("input_token_details") or {}).get("cache_read")
+    if cached is None:
+        # OpenAI-compatible APIs also report it in response_metadata
+        reported = (getattr(chat_resp, "response_metadata", None) or {}).get("token_usage") or {}
+        input_tokens = input_tokens or reported.get("prompt_tokens", 0)
+        cached = (reported.get("prompt_tokens_details") or {}).get("cached_tokens")
+    cached = cached or 0
+    return {
+        "input_tokens": input_tokens,
+        "cached_tokens": cached,
+        "uncached_tokens": input_tokens - cached,
+        "output_tokens": usage.get("output_tokens", 0),
+    }
+
+
+def usage_summary(usage_log) -> dict:
+    input_tokens = sum(u["input_tokens"] for u in usage_log)
+    cached = sum(u["cached_tokens"] for u in usage_log)
+    return {
+        "turns": len(usage_log),
+        "input_tokens": input_tokens,
+        "cached_tokens": cached,
+        "uncached_tokens": input_tokens - cached,
+        "output_tokens": sum(u["output_tokens"] for u in usage_log),
+        "cache_hit_rate": cached / input_tokens if input_tokens else None,
+    }
@@ -0,0 +1,125 @@
+import numpy as np
+from .base import Agent
+from .buyer import buyer_inference, buyer_emotion_discount_choice
+from .seller import opening_offer, evolve_seller_emotion_discount
+from bargain_langgraph.dynamics.emotion_discount import load_seller_profile
+"""
+Rule-based (LLM-free) buyer and seller agents
+Same act() signatures as BuyerAgent / SellerAgent, so they plug into the graph
+and the marketplace engine. Useful for large simulations and for testing.
+
+Both sides concede a fraction of the current gap each turn, the fraction
+shrinking with patience (discount). Prices never cross the agent's own cost.
+"""
+
+class RuleBuyerAgent(Agent):
+    def __init__(self,
+                 concession=0.3,
+                 accept_gap=10.0,
+                 anchor=0.85,
+                 noise=0.0,
+                 seed=None,
+                 latency=1.0):
+        # concession: fraction of the gap conceded per offer (before patience scaling)
+        # accept_gap: accept once the seller offer is within this many dollars of ours
+        # anchor: first offer as a fraction of avg_similar_price
+        # noise: relative std of multiplicative noise on offers
+        # latency: time one turn takes (used by the marketplace scheduler)
+        self.concession = concession
+        self.accept_gap = accept_gap
+        self.anchor = anchor
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.latency = latency
+
+    def act(self, state) -> tuple[dict, tuple, tuple]:
+        inference = buyer_inference(state)
+        buyer_choices = buyer_emotion_discount_choice(state, inference)
+        buyer_emotion, buyer_discount = buyer_choices
+
+        cost = state["buyer_cost"]
+        seller_offer = state["current_seller_offer"]
+        own = state["current_buyer_offer"]
+        last_turn = state["round"] >= state["max_rounds"] - 1
+
+        if seller_offer is not None and seller_offer <= cost:
+            if own is not None and seller_offer - own <= self.accept_gap:
+                return ({"action": "accept", "price": None,
+                         "message": f"Deal, ${seller_offer} works for me."},
+                        inference, buyer_choices)
+            if last_turn:
+                return ({"action": "accept", "price": None,
+                         "message": f"We are out of time, I accept ${seller_offer}."},
+                        inference, buyer_choices)
+
+        if last_turn:
+            return ({"action": "breakdown", "price": None,
+                     "message": "Sorry, this is above what I can pay. I am out."},
+                    inference, buyer_choices)
+
+        if own is None:
+            price = self.anchor * state["avg_similar_price"]
+        else:
+            gap = seller_offer - own
+            price = own + self.concession * (1 - buyer_discount / 2) * gap
+        if self.noise > 0:
+            price *= 1 + self.noise * self.rng.standard_normal()
+        price = min(price, cost)
+        if seller_offer is not None:
+            price = min(price, seller_offer)
+        price = round(float(price), 2)
+
+        return ({"action": "offer", "price": price,
+                 "message": f"I can offer ${price}."},
+                inference, buyer_choices)
+
+
+class RuleSellerAgent(Agent):
+    def __init__(self,
+                 concession=0.3,
+                 accept_gap=10.0,
+                 noise=0.0,
+                 seed=None,
+                 latency=1.0,
+                 seller_profile=None):
+        self.concession = concession
+        self.accept_gap = accept_gap
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.latency = latency
+        self.seller_params, self.emotion_probs = None, None
+        if seller_profile is not None:
+            self.seller_params, self.emotion_probs = load_seller_profile(seller_profile)
+
+    def act(self, state) -> tuple[dict, tuple]:
+        if state["round"] == 0:
+            return opening_offer(state)
+
+        seller_choices = evolve_seller_emotion_discount(state, self.seller_params, self.emotion_probs)
+        seller_emotion, seller_discount = seller_choices
+
+        cost = state["seller_cost"]
+        buyer_offer = state["current_buyer_offer"]
+        own = state["current_seller_offer"]
+        last_turn = state["round"] >= state["max_rounds"] - 1
+
+        if buyer_offer is None:
+            return ({"action": "ponder", "price": None,
+                     "message": f"My offer of ${own} still stands."},
+                    seller_choices)
+
+        if buyer_offer >= cost and (own - buyer_offer <= self.accept_gap or last_turn):
+            return ({"action": "accept", "price": None,
+                     "message": f"Deal, ${buyer_offer} works for me."},
+                    seller_choices)
+
+        gap = own - buyer_offer
+        price = own - self.concession * (1 - seller_discount / 2) * gap
+        if self.noise > 0:
+            price *= 1 + self.noise * self.rng.standard_normal()
+        price = max(price, cost, buyer_offer)
+        price = round(float(price), 2)
+
+        return ({"action": "offer", "price": price,
+                 "message": f"I can lower my offer to ${price}."},
+                seller_choices)
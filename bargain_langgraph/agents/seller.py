@@ -1,11 +1,13 @@
-import json
-from .base import Agent
+from .base import Agent, invoke_llm
+from .chat import build_chat_messages
+from bargain_langgraph.profiling import phase
 from bargain_langgraph.dynamics.emotion_discount import *
 """
 Describes the seller agent and how this agent acts
 Written by: Sunrit Chakraborty
 """
-def evolve_seller_emotion_discount(state):
+def evolve_seller_emotion_discount(state, seller_params=None, emotion_probs=None):
+    # seller_params / emotion_probs: fitted dynamics (see load_seller_profile), defaults if None
     if state["seller_discount_type"] == "static":
         seller_discount = state["seller_discount"]
     else:
@@ -14,37 +16,52 @@ def evolve_seller_emotion_discount(state):
                                           state["max_rounds"],
                                           state["current_buyer_offer"],
                                           state["seller_cost"],
-                                          state["buyer_cost"])
+                                          state["buyer_cost"],
+                                          seller_params)
 
     if state["seller_emotion_type"] == "static":
         seller_emotion = state["seller_emotion"]
     else:
-        seller_emotion = update_emotion(seller_discount)
+        seller_emotion = update_emotion(seller_discount, emotion_probs)
 
     return seller_emotion, seller_discount
 
+def opening_offer(state):
+    # First turn: initial offer (same for every seller agent)
+    if state["initial_offer"] is None:
+        gap = state["buyer_cost"] - state["seller_cost"]
+        price = state["buyer_cost"] - 0.05 * gap
+        # example: if v_B=150, v_S=100, gap=50, price=150-0.05*50=147.5
+    else:
+        price = state["initial_offer"]
+    name = state["seller_name"]
+    message = f"Hi, I am {name}. My first offer is ${price} for the {state['product_name']}. Are you interested?"
+    seller_choices = state["seller_emotion"], state["seller_discount"]
+    return {"action": "offer", "price": price, "message": message} , seller_choices
+
 class SellerAgent(Agent):
-    def __init__(self, llm, prompt_template: str):
+    def __init__(self, llm, prompt_template: str, seller_profile=None, turn_template: str = None,
+                 usage_log=None):
+        # seller_profile: path of a fitted seller dynamics profile (see estimation.py)
+        # turn_template: if given, chat prompt mode (see chat.py); prompt_template is then
+        # the system template (e.g. seller_system.txt) and turn_template e.g. seller_turn.txt
+        # usage_log: optional list, gets the token usage of every LLM call
         self.llm = llm
         self.prompt = prompt_template
+        self.turn_prompt = turn_template
+        self.usage_log = usage_log
+        self.seller_params, self.emotion_probs = None, None
+        if seller_profile is not None:
+            self.seller_params, self.emotion_probs = load_seller_profile(seller_profile)
 
     def act(self, state) -> tuple[dict, tuple]:
         if state["round"] == 0:
-            # First turn: initial offer
-            if state["initial_offer"] is None:
-                gap = state["buyer_cost"] - state["seller_cost"]
-                price = state["buyer_cost"] - 0.05 * gap
-                # example: if v_B=150, v_S=100, gap=50, price=150-0.05*50=147.5
-            else:
-                price = state["initial_offer"]
-            name = state["seller_name"]
-            message = f"Hi, I am {name}. My first offer is ${price} for the {state['product_name']}. Are you interested?"
-            seller_choices = state["seller_emotion"], state["seller_discount"]
-            return {"action": "offer", "price": price, "message": message} , seller_choices
+            return opening_offer(state)
 
 
         # evolve emotion and/or discount
-        seller_choices = evolve_seller_emotion_discount(state)
+        with phase("dynamics"):
+            seller_choices = evolve_seller_emotion_discount(state, self.seller_params, self.emotion_probs)
         seller_emotion, seller_discount = seller_choices
 
         # bake these into state
@@ -52,24 +69,18 @@ class SellerAgent(Agent):
         new_state["seller_emotion"] = seller_emotion
         new_state["seller_discount"] = seller_discount
 
-        prompt_text = self.prompt.format(**new_state)
-
         # Build messages
-        messages = [
-            {"role": "system", "content": "You are a seller agent in a bargaining simulation."},
-            {"role": "user", "content": prompt_text}
-        ]
-
-        # Call the LLM
-        chat_resp = self.llm.invoke(messages)
-
-        # Extract content
-        parsed = json.loads(chat_resp.content)
-
-        if not isinstance(parsed, dict):
-            raise TypeError("LLM output must be a dict")
+        with phase("render"):
+            if self.turn_prompt is not None:
+                messages = build_chat_messages(self.prompt, self.turn_prompt, new_state, "seller")
+            else:
+                prompt_text = self.prompt.format(**new_state)
+                messages = [
+                    {"role": "system", "content": "You are a seller agent in a bargaining simulation."},
+                    {"role": "user", "content": prompt_text}
+                ]
 
-        if "action" not in parsed or "message" not in parsed or "price" not in parsed:
-            raise ValueError(f"Malformed LLM output: {parsed}")
+        # Call the LLM (and parse its output)
+        parsed = invoke_llm(self.llm, messages, new_state, "seller", self.usage_log)
 
         return parsed, seller_choices
\ No newline at end of file
@@ -1,3 +1,4 @@
+import json
 import numpy as np
 
 """
@@ -7,8 +8,20 @@ p(delta|.) = Beta(mu * kappa, (1-mu)*kappa)
 mu = (1-rho) sigma(a) + rho delta_last
 a = beta0 + beta1 (1-t/T) + beta2 (current_offer - seller_cost) / (buyer_cost - seller_cost))
 sigma is the logistic link function
+
+The defaults below are hand-picked; estimation.py fits both the discount
+parameters and the emotion tables to data, saved as a profile that
+load_seller_profile reads.
 """
 
+DEFAULT_SELLER_PARAMS = {
+    "beta0": 0.2,
+    "beta1": 0.5,
+    "beta2": 0.3,
+    "rho": 0.5,
+    "kappa": 0.9
+}
+
 def update_discount(current_discount,
                     round,
                     max_rounds,
@@ -18,13 +31,7 @@ def update_discount(current_discount,
                     seller_params=None):
     # default params
     if seller_params is None:
-        seller_params = {
-            "beta0": 0.2,
-            "beta1": 0.5,
-            "beta2": 0.3,
-            "rho": 0.5,
-            "kappa": 0.9
-        }
+        seller_params = DEFAULT_SELLER_PARAMS
 
     beta0=seller_params["beta0"]
     beta1=seller_params["beta1"]
@@ -40,41 +47,46 @@ def update_discount(current_discount,
     delta = np.random.beta(b1, b2)
     return delta
 
-def update_emotion(delta):
-    emotions = [
-        "baseline",
-        "neutral",
-        "joy",
-        "trust",
-        "fear",
-        "surprise",
-        "sadness",
-        "disgust",
-        "anger",
-        "anticipation"
-    ]
+EMOTIONS = [
+    "baseline",
+    "neutral",
+    "joy",
+    "trust",
+    "fear",
+    "surprise",
+    "sadness",
+    "disgust",
+    "anger",
+    "anticipation"
+]
 
-    # for 0 < delta < 0.3
-    p1 = [10, 0, 0, 0, 4, 2, 3, 3, 10, 5]
-    p1 = np.array(p1) / np.sum(p1)
-
-    # for 0.3 < delta < 0.7
-    p2 = [10, 6, 1, 5, 2, 1, 3, 2, 4, 2]
-    p2 = np.array(p2) / np.sum(p2)
-
-    # for 0.7 < delta < 1.0
-    p3 = [10, 1, 5, 4, 1, 3, 1, 0, 0, 4]
-    p3 = np.array(p3) / np.sum(p3)
-
-    if delta < 0.3:
-        idx = np.random.choice(len(emotions), p=p1)
-    elif delta < 0.7:
-        idx = np.random.choice(len(emotions), p=p2)
-    else:
-        idx = np.random.choice(len(emotions), p=p3)
-    return emotions[idx]
+# relative weights of each emotion, for 0 < delta < 0.3, 0.3 < delta < 0.7, 0.7 < delta < 1.0
+EMOTION_WEIGHTS = [
+    [10, 0, 0, 0, 4, 2, 3, 3, 10, 5],
+    [10, 6, 1, 5, 2, 1, 3, 2, 4, 2],
+    [10, 1, 5, 4, 1, 3, 1, 0, 0, 4]
+]
 
+def emotion_bin(delta):
+    # index of the emotion table used for discount delta (works on arrays too)
+    return (np.asarray(delta) >= 0.3).astype(int) + (np.asarray(delta) >= 0.7).astype(int)
 
+def update_emotion(delta, emotion_probs=None):
+    emotions = EMOTIONS
 
+    # emotion_probs: 3 rows of probabilities over EMOTIONS (e.g. from a fitted profile)
+    if emotion_probs is None:
+        emotion_probs = EMOTION_WEIGHTS
+    p = np.array(emotion_probs[int(emotion_bin(delta))], dtype=float)
+    p = p / np.sum(p)
 
+    idx = np.random.choice(len(emotions), p=p)
+    return emotions[idx]
 
+def load_seller_profile(path):
+    # fitted seller dynamics (see estimation.py) -> (seller_params, emotion_probs)
+    with open(path, "r") as f:
+        profile = json.load(f)
+    if profile.get("emotions", EMOTIONS) != EMOTIONS:
+        raise ValueError(f"Profile '{path}' uses a different emotion vocabulary")
+    return profile["seller_params"], profile.get("emotion_probs")
@@ -0,0 +1,304 @@
+import argparse
+import json
+import numpy as np
+
+from .emotion_discount import EMOTIONS, DEFAULT_SELLER_PARAMS, emotion_bin
+from .transitions import flatten_history
+"""
+Maximum likelihood fit of the seller transition in emotion_discount.py
+
+Discount: delta ~ Beta(mu kappa, (1 - mu) kappa),
+          mu = (1 - rho) sigma(beta0 + beta1 (1 - t/T) + beta2 x) + rho delta_last
+The Beta log-likelihood and its gradient are computed in closed form,
+vectorized over all observed transitions. The optimisation runs on the
+unconstrained (beta0, beta1, beta2, logit rho, log kappa) with BFGS from several
+starting points (on a subsample, the best one refined on all data); standard errors come from the inverse observed information
+(finite differences of the analytic gradient), mapped back by the delta method.
+
+Emotion: update_emotion draws from one of three tables depending on the new
+discount (< 0.3, < 0.7, else); the MLE of each table is the (smoothed)
+frequency of each emotion in that bin.
+
+rho is only identified when delta_last varies across transitions (several
+sellers / starting discounts); with a single one it trades off against beta0,
+which shows up as large standard errors.
+
+The fit is saved as a profile that update_discount / update_emotion (through
+load_seller_profile) and the seller agents can use:
+
+    python -m bargain_langgraph.dynamics.estimation --data saved_chats --out seller_profile.json
+"""
+
+PARAM_NAMES = ["beta0", "beta1", "beta2", "rho", "kappa"]
+EPS = 1e-12
+
+
+# -------------------------
+# Special functions (vectorized, x > 0)
+# -------------------------
+def lgamma(x):
+    # shift to x + 7, then Stirling series
+    shift = x * (x + 1) * (x + 2) * (x + 3) * (x + 4) * (x + 5) * (x + 6)
+    z = x + 7
+    z2 = 1 / (z * z)
+    series = (1 / 12 - z2 * (1 / 360 - z2 * (1 / 1260 - z2 / 1680))) / z
+    return (z - 0.5) * np.log(z) - z + 0.5 * np.log(2 * np.pi) + series - np.log(shift)
+
+
+def digamma(x):
+    shift = sum(1 / (x + i) for i in range(7))
+    z = x + 7
+    z2 = 1 / (z * z)
+    series = z2 * (1 / 12 - z2 * (1 / 120 - z2 * (1 / 252 - z2 * (1 / 240 - z2 / 132))))
+    return np.log(z) - 0.5 / z - series - shift
+
+
+# -------------------------
+# Data
+# -------------------------
+def transitions_from_conversations(records, previous="state") -> dict:
+    # records: conversations saved by runner.py (history + initial_state)
+    # previous: which discount played the role of delta_last
+    #   "state"   - the discount held in the State when update_discount ran; apply_seller_action
+    #               keeps this at its initial value, so this matches conversations from this repo
+    #   "history" - the previous recorded seller discount (the documented Markov model,
+    #               for external data)
+    prev, rounds, max_rounds, offers, discounts, emotion_discounts, emotions = [], [], [], [], [], [], []
+    for record in records:
+        initial = record["initial_state"]
+        if initial.get("seller_discount_type") != "dynamic":
+            continue
+        gap = float(initial["buyer_cost"]) - float(initial["seller_cost"])
+        last_discount = float(initial["seller_discount"])
+        buyer_offer = None
+        seller_round = 0
+        for turn in flatten_history(record["history"]):
+            if turn["role"] == "buyer":
+                if turn["action"] == "offer" and turn["price"] is not None:
+                    buyer_offer = float(turn["price"])
+                continue
+            if seller_round > 0 and buyer_offer is not None:
+                prev.append(float(initial["seller_discount"]) if previous == "state" else last_discount)
+                rounds.append(seller_round)
+                max_rounds.append(float(initial["max_rounds"]))
+                offers.append((buyer_offer - float(initial["seller_cost"])) / gap)
+                discounts.append(float(turn["discount"]))
+                if initial.get("seller_emotion_type") == "dynamic":
+                    emotion_discounts.append(float(turn["discount"]))
+                    emotions.append(turn["emotion"])
+            last_discount = float(turn["discount"])
+            seller_round += 1
+
+    return {
+        "previous": np.array(prev),
+        "round": np.array(rounds, dtype=float),
+        "max_rounds": np.array(max_rounds),
+        "offer": np.array(offers),
+        "discount": np.array(discounts),
+        "emotion_discount": np.array(emotion_discounts),
+        "emotion": np.array(emotions, dtype=object),
+    }
+
+
+def simulate_transitions(n, seller_params=None, max_rounds=10, seed=None) -> dict:
+    # synthetic transitions from the model (for checking the estimator)
+    if seller_params is None:
+        seller_params = DEFAULT_SELLER_PARAMS
+    rng = np.random.default_rng(seed)
+    data = {
+        "previous": rng.uniform(0.05, 0.95, n),
+        "round": rng.integers(1, max_rounds, n).astype(float),
+        "max_rounds": np.full(n, float(max_rounds)),
+        "offer": rng.uniform(-0.2, 1.0, n),
+    }
+    mu = transition_mean(data, *(seller_params[k] for k in PARAM_NAMES[:4]))
+    kappa = seller_params["kappa"]
+    data["discount"] = rng.beta(mu * kappa, (1 - mu) * kappa)
+    return data
+
+
+# -------------------------
+# Likelihood
+# -------------------------
+def features(data):
+    return np.stack([np.ones_like(data["round"]),
+                     1 - data["round"] / data["max_rounds"],
+                     data["offer"]])
+
+
+def transition_mean(data, beta0, beta1, beta2, rho):
+    a = np.array([beta0, beta1, beta2]) @ features(data)
+    return (1 - rho) / (1 + np.exp(-a)) + rho * data["previous"]
+
+
+def to_natural(theta):
+    return np.array([theta[0], theta[1], theta[2], 1 / (1 + np.exp(-theta[3])), np.exp(theta[4])])
+
+
+def to_unconstrained(params):
+    rho, kappa = params[3], params[4]
+    return np.array([params[0], params[1], params[2], np.log(rho / (1 - rho)), np.log(kappa)])
+
+
+class BetaTransitionLikelihood:
+    # mean log-likelihood and gradient in the unconstrained parametrisation
+    def __init__(self, data):
+        self.x = features(data)
+        self.previous = data["previous"]
+        y = np.clip(data["discount"], EPS, 1 - EPS)
+        self.log_y = np.log(y)
+        self.log_1my = np.log1p(-y)
+        self.n = len(y)
+
+    def __call__(self, theta, gradient=True):
+        beta0, beta1, beta2, rho, kappa = to_natural(theta)
+        s = 1 / (1 + np.exp(-(np.array([beta0, beta1, beta2]) @ self.x)))
+        mu = np.clip((1 - rho) * s + rho * self.previous, EPS, 1 - EPS)
+        alpha = mu * kappa
+        beta = (1 - mu) * kappa
+        ll = (lgamma(kappa) - lgamma(alpha) - lgamma(beta)
+              + (alpha - 1) * self.log_y + (beta - 1) * self.log_1my)
+        value = ll.mean()
+        if not gradient:
+            return value
+
+        psi_a, psi_b = digamma(alpha), digamma(beta)
+        d_mu = kappa * (psi_b - psi_a + self.log_y - self.log_1my)
+        d_kappa = digamma(kappa) - mu * psi_a - (1 - mu) * psi_b + mu * self.log_y + (1 - mu) * self.log_1my
+        d_a = d_mu * (1 - rho) * s * (1 - s)
+        grad = np.empty(5)
+        grad[:3] = self.x @ d_a / self.n
+        grad[3] = (d_mu * (self.previous - s)).mean() * rho * (1 - rho)
+        grad[4] = d_kappa.mean() * kappa
+        return value, grad
+
+
+# -------------------------
+# Optimisation
+# -------------------------
+def bfgs_maximize(f, theta, max_iter=200, tol=1e-8):
+    value, grad = f(theta)
+    h_inv = np.eye(len(theta))
+    for _ in range(max_iter):
+        direction = h_inv @ grad
+        step = 1.0
+        while True:
+            candidate = theta + step * direction
+            new_value = f(candidate, gradient=False)
+            if np.isfinite(new_value) and new_value >= value + 1e-4 * step * grad @ direction:
+                break
+            step *= 0.5
+            if step < 1e-10:
+                return theta, value
+        new_value, new_grad = f(candidate)
+        s, y = candidate - theta, grad - new_grad
+        theta, value, grad = candidate, new_value, new_grad
+        if np.max(np.abs(grad)) < tol:
+            break
+        sy = s @ y
+        if sy > 1e-12:
+            rho = 1 / sy
+            eye = np.eye(len(theta))
+            h_inv = (eye - rho * np.outer(s, y)) @ h_inv @ (eye - rho * np.outer(y, s)) + rho * np.outer(s, s)
+    return theta, value
+
+
+def numerical_hessian(f, theta, h=1e-4):
+    k = len(theta)
+    hess = np.empty((k, k))
+    for i in range(k):
+        e = np.zeros(k)
+        e[i] = h
+        hess[i] = (f(theta + e)[1] - f(theta - e)[1]) / (2 * h)
+    return (hess + hess.T) / 2
+
+
+def subsample(data, size, rng):
+    n = len(data["discount"])
+    if n <= size:
+        return data
+    idx = rng.choice(n, size, replace=False)
+    return {k: data[k][idx] for k in ("previous", "round", "max_rounds", "offer", "discount")}
+
+
+def fit_discount_transition(data, restarts=5, seed=0, restart_sample=100_000) -> dict:
+    # restarts run on a subsample of at most restart_sample transitions; the best
+    # one is then refined on the full data
+    f = BetaTransitionLikelihood(data)
+    rng = np.random.default_rng(seed)
+    f_start = BetaTransitionLikelihood(subsample(data, restart_sample, rng))
+    starts = [to_unconstrained(np.array([DEFAULT_SELLER_PARAMS[k] for k in PARAM_NAMES]))]
+    starts += [np.concatenate([rng.normal(0, 1, 3), rng.normal(0, 1.5, 1), rng.normal(0, 1, 1)])
+               for _ in range(restarts - 1)]
+
+    best_theta, best_value = None, -np.inf
+    for start in starts:
+        theta, value = bfgs_maximize(f_start, start)
+        if value > best_value:
+            best_theta, best_value = theta, value
+    best_theta, best_value = bfgs_maximize(f, best_theta)
+
+    # standard errors: inverse observed information, delta method to natural params
+    hess = numerical_hessian(f, best_theta) * f.n
+    cov = np.linalg.pinv(-hess)
+    natural = to_natural(best_theta)
+    jac = np.array([1.0, 1.0, 1.0, natural[3] * (1 - natural[3]), natural[4]])
+    se = np.sqrt(np.clip(np.diag(cov), 0, None)) * jac
+
+    return {
+        "seller_params": dict(zip(PARAM_NAMES, natural.tolist())),
+        "standard_errors": dict(zip(PARAM_NAMES, se.tolist())),
+        "log_likelihood": float(best_value * f.n),
+        "n_transitions": f.n,
+    }
+
+
+def fit_emotion_tables(discounts, emotions, smoothing=0.5) -> dict:
+    # per discount bin, smoothed emotion frequencies (multinomial MLE)
+    codes = np.array([EMOTIONS.index(e) for e in emotions], dtype=int)
+    bins = emotion_bin(np.asarray(discounts))
+    counts = np.zeros((3, len(EMOTIONS)))
+    np.add.at(counts, (bins, codes), 1)
+    probs = (counts + smoothing) / (counts + smoothing).sum(axis=1, keepdims=True)
+    n = counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se = np.sqrt(probs * (1 - probs) / n)
+    return {
+        "emotion_probs": probs.tolist(),
+        "emotion_standard_errors": np.where(n > 0, se, np.nan).tolist(),
+        "emotion_counts": counts.astype(int).tolist(),
+    }
+
+
+def fit_seller_profile(data, restarts=5, seed=0) -> dict:
+    profile = {"emotions": EMOTIONS}
+    profile.update(fit_discount_transition(data, restarts, seed))
+    if len(data.get("emotion", [])):
+        profile.update(fit_emotion_tables(data["emotion_discount"], data["emotion"]))
+    return profile
+
+
+def save_profile(profile, path):
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+
+if __name__ == "__main__":
+    from bargain_langgraph.evaluation.trajectory import load_saved_conversations
+
+    parser = argparse.ArgumentParser(description="Fit seller discount / emotion transitions")
+    parser.add_argument("--data", required=True, help="Directory of conversations saved by runner.py")
+    parser.add_argument("--out", required=True, help="Path of the seller profile (json) to write")
+    parser.add_argument("--previous", required=False, default="state", choices=["state", "history"],
+                        help="Which discount plays delta_last (see transitions_from_conversations)")
+    parser.add_argument("--restarts", required=False, default=5, type=int, help="Optimiser restarts")
+    args = parser.parse_args()
+
+    data = transitions_from_conversations(load_saved_conversations(args.data), args.previous)
+    if len(data["discount"]) == 0:
+        raise SystemExit("No dynamic-seller transitions found")
+    profile = fit_seller_profile(data, args.restarts)
+    save_profile(profile, args.out)
+    for name in PARAM_NAMES:
+        print(f"{name}: {profile['seller_params'][name]:.4f} (se {profile['standard_errors'][name]:.4f})")
+    print(f"Fitted on {profile['n_transitions']} transitions, saved to {args.out}")
@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import numpy as np
+
+from .emotion_discount import EMOTIONS
+"""
+Synthetic scenario (product) and persona catalogs
+
+Scenarios follow the schema of scenarios/examples.json and personas that of
+profiles/personas.json. Sampling is vectorized and seeded; scenarios are
+stratified over the cost gap (relative to avg_similar_price) and market
+conditions (low/high demand x low/high supply), with an equal share per
+stratum. Every scenario satisfies
+    0 < seller_cost < buyer_cost,  avg_similar_price < avg_new_price,  0 <= demand, supply <= 10
+
+Catalogs are written as shards of column arrays (.npz) with string columns
+stored as codes into a vocabulary kept in index.json, so a million entries are
+generated and written in seconds. Catalog(directory, "scenarios") gives
+dict-like access in the usual schema and can be passed to get_initial_state.
+Persona keys (e.g. "Lucas_0000042") only identify the record; personas also
+carry a display "name" (e.g. "Lucas"), which build_state puts in the State for
+the prompts:
+
+    python -m bargain_langgraph.dynamics.generator --out catalogs/gen --scenarios 1000000 --personas 10000
+    scenarios = Catalog("catalogs/gen", "scenarios")
+    profiles = Catalog("catalogs/gen", "personas")
+    state = get_initial_state(scenarios.key(0), profiles.key(0), profiles.key(1),
+                              scenarios=scenarios, profiles=profiles)
+"""
+
+# product types: (category, names, descriptions, new price range, max years used)
+PRODUCT_TYPES = [
+    ("electronics", ["Lenovo laptop", "Dell laptop", "HP laptop"],
+     ["15-inch laptop with Intel i5, 16GB RAM, 512GB SSD",
+      "14-inch ultrabook with Intel i7, 16GB RAM, 1TB SSD",
+      "15-inch laptop with Ryzen 5, 8GB RAM, 256GB SSD"], (500.0, 1500.0), 6),
+    ("electronics", ["Macbook air", "Macbook pro", "iPad pro"],
+     ["13 inch, lightweight with M1 chip, 512GB SSD",
+      "14 inch with M2 Pro chip, 16GB RAM, 1TB SSD",
+      "12.9 inch tablet with M1 chip and keyboard"], (900.0, 2500.0), 5),
+    ("electronics", ["iPhone", "Samsung Galaxy phone", "Google Pixel phone"],
+     ["128GB, unlocked, with charger",
+      "256GB, unlocked, minor scratches on the back",
+      "128GB, carrier locked, with case"], (400.0, 1200.0), 4),
+    ("electronics", ["Canon DSLR camera", "Sony mirrorless camera", "Nikon DSLR camera"],
+     ["24MP body with 18-55mm kit lens",
+      "full-frame body, 2 batteries and charger",
+      "body only, low shutter count"], (500.0, 2500.0), 8),
+    ("furniture", ["IKEA sofa", "Oak dining table", "Office chair"],
+     ["three-seater, grey fabric, removable covers",
+      "seats six, solid wood, extendable",
+      "ergonomic, adjustable arms and lumbar support"], (150.0, 1500.0), 10),
+    ("appliances", ["Dyson vacuum", "Espresso machine", "Washing machine"],
+     ["cordless, two batteries, all attachments",
+      "15 bar pump with milk frother",
+      "front loading, 8kg capacity"], (150.0, 1200.0), 8),
+    ("vehicles", ["Road bike", "Electric scooter", "Mountain bike"],
+     ["aluminium frame, 22 speeds, size 56",
+      "25 km range, foldable",
+      "full suspension, 29 inch wheels"], (300.0, 3000.0), 10),
+    ("sports", ["Treadmill", "Rowing machine", "Set of golf clubs"],
+     ["foldable, 12 programs, up to 16 km/h",
+      "magnetic resistance, foldable",
+      "irons, woods, putter and bag"], (200.0, 2000.0), 10),
+]
+
+CONDITIONS = ["like new", "excellent", "good, light signs of use",
+              "slight external wear and tear", "visible wear, fully working"]
+
+# cost gap as a fraction of avg_similar_price, and market conditions
+GAP_BINS = [(0.05, 0.15), (0.15, 0.30), (0.30, 0.60)]
+MARKET_LEVELS = [(0, 5), (6, 10)]   # low, high (inclusive integer ranges)
+
+FIRST_NAMES = ["Ravi", "Leah", "Maya", "Omar", "Sofia", "Kenji", "Amara", "Lucas",
+               "Priya", "Diego", "Hannah", "Wei", "Fatima", "Noah", "Elena", "Kwame"]
+TEMPERS = ["Calm", "Impatient", "Cheerful", "Anxious", "Stubborn", "Easygoing"]
+TRAITS = ["analytical", "intuitive", "detail-oriented", "pragmatic", "sentimental"]
+MANNERS = ["polite", "blunt", "friendly", "reserved", "talkative"]
+EXPERTISE = ["novice", "average", "experienced", "expert"]
+BACKGROUNDS = ["Graduate student on a tight budget",
+               "Software engineer upgrading equipment",
+               "Small business owner looking for a deal",
+               "Retired teacher, careful with money",
+               "Parent furnishing a new home",
+               "Freelancer who needs it for work",
+               "Collector who resells second-hand items",
+               "Professional moving abroad, selling belongings"]
+
+SCHEMA_VERSION = 1
+
+
+# -------------------------
+# Sampling
+# -------------------------
+def sample_scenarios(n, seed=None) -> dict:
+    rng = np.random.default_rng(seed)
+
+    # strata: gap bin x demand level x supply level, equal share each
+    n_strata = len(GAP_BINS) * len(MARKET_LEVELS) ** 2
+    stratum = rng.permutation(np.arange(n) % n_strata).astype(np.int16)
+    gap_bin = stratum // len(MARKET_LEVELS) ** 2
+    demand_level = (stratum // len(MARKET_LEVELS)) % len(MARKET_LEVELS)
+    supply_level = stratum % len(MARKET_LEVELS)
+
+    product_type = rng.integers(0, len(PRODUCT_TYPES), n).astype(np.int16)
+    variant = rng.integers(0, 3, n).astype(np.int16)
+    price_lo = np.array([t[3][0] for t in PRODUCT_TYPES])[product_type]
+    price_hi = np.array([t[3][1] for t in PRODUCT_TYPES])[product_type]
+    max_used = np.array([t[4] for t in PRODUCT_TYPES])[product_type]
+
+    # new price log-uniform in the type's range, then depreciation with age and condition
+    avg_new_price = np.exp(rng.uniform(np.log(price_lo), np.log(price_hi)))
+    used = rng.integers(0, max_used + 1)
+    condition = np.clip(used * len(CONDITIONS) // (max_used + 1) + rng.integers(-1, 2, n),
+                        0, len(CONDITIONS) - 1)
+    retained = 0.85 ** used * (1 - 0.05 * condition) * rng.uniform(0.85, 0.97, n)
+    avg_similar_price = avg_new_price * retained
+
+    levels = np.array(MARKET_LEVELS)
+    demand = rng.integers(levels[demand_level, 0], levels[demand_level, 1] + 1)
+    supply = rng.integers(levels[supply_level, 0], levels[supply_level, 1] + 1)
+
+    # costs around a market-adjusted midpoint, gap drawn within the stratum's bin
+    bins = np.array(GAP_BINS)
+    gap = rng.uniform(bins[gap_bin, 0], bins[gap_bin, 1]) * avg_similar_price
+    midpoint = avg_similar_price * (1 + 0.1 * (demand - supply) / 10 + rng.normal(0, 0.03, n))
+    seller_cost = np.round(midpoint - gap / 2, 2)
+    buyer_cost = np.round(midpoint + gap / 2, 2)
+
+    columns = {
+        "product_type": product_type,
+        "variant": variant,
+        "condition": condition.astype(np.int8),
+        "used": used.astype(np.int8),
+        "avg_new_price": np.round(avg_new_price),
+        "avg_similar_price": np.round(avg_similar_price),
+        "demand": demand.astype(np.int8),
+        "supply": supply.astype(np.int8),
+        "buyer_cost": buyer_cost,
+        "seller_cost": seller_cost,
+        "stratum": stratum,
+    }
+    validate_scenarios(columns)
+    return columns
+
+
+def validate_scenarios(columns):
+    checks = {
+        "seller_cost > 0": columns["seller_cost"] > 0,
+        "seller_cost < buyer_cost": columns["seller_cost"] < columns["buyer_cost"],
+        "avg_similar_price < avg_new_price": columns["avg_similar_price"] < columns["avg_new_price"],
+        "0 <= demand <= 10": (columns["demand"] >= 0) & (columns["demand"] <= 10),
+        "0 <= supply <= 10": (columns["supply"] >= 0) & (columns["supply"] <= 10),
+    }
+    for name, ok in checks.items():
+        if not np.all(ok):
+            raise ValueError(f"{np.sum(~ok)} scenarios violate {name}")
+
+
+def sample_personas(n, seed=None) -> dict:
+    rng = np.random.default_rng(seed)
+    return {
+        "first_name": rng.integers(0, len(FIRST_NAMES), n).astype(np.int16),
+        "temper": rng.integers(0, len(TEMPERS), n).astype(np.int16),
+        "trait": rng.integers(0, len(TRAITS), n).astype(np.int16),
+        "manner": rng.integers(0, len(MANNERS), n).astype(np.int16),
+        "expertise": rng.integers(0, len(EXPERTISE), n).astype(np.int16),
+        "background": rng.integers(0, len(BACKGROUNDS), n).astype(np.int16),
+        "emotion": rng.integers(0, len(EMOTIONS), n).astype(np.int16),
+        "discount": np.round(np.clip(rng.beta(2.0, 2.0, n), 0.05, 0.95), 2),
+    }
+
+
+# -------------------------
+# Catalog files
+# -------------------------
+def vocabulary() -> dict:
+    return {
+        "categories": [t[0] for t in PRODUCT_TYPES],
+        "product_names": [t[1] for t in PRODUCT_TYPES],
+        "descriptions": [t[2] for t in PRODUCT_TYPES],
+        "conditions": CONDITIONS,
+        "first_names": FIRST_NAMES,
+        "tempers": TEMPERS,
+        "traits": TRAITS,
+        "manners": MANNERS,
+        "expertise": EXPERTISE,
+        "backgrounds": BACKGROUNDS,
+        "emotions": EMOTIONS,
+    }
+
+
+def write_catalog(directory, n_scenarios, n_personas, seed=0, shard_size=100_000) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    # independent streams for the two catalogs and for each shard
+    seeds = np.random.SeedSequence(seed).spawn(2)
+    index = {
+        "version": SCHEMA_VERSION,
+        "seed": seed,
+        "shard_size": shard_size,
+        "vocab": vocabulary(),
+    }
+    for kind, n, sampler, seq in (("scenarios", n_scenarios, sample_scenarios, seeds[0]),
+                                  ("personas", n_personas, sample_personas, seeds[1])):
+        n_shards = -(-n // shard_size)
+        shard_seeds = seq.spawn(n_shards)
+        for shard in range(n_shards):
+            size = min(shard_size, n - shard * shard_size)
+            columns = sampler(size, shard_seeds[shard])
+            np.savez(os.path.join(directory, f"{kind}-{shard:05d}.npz"), **columns)
+        index[kind] = n
+
+    with open(os.path.join(directory, "index.json"), "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+class Catalog:
+    # dict-like, read-only view on a generated catalog (shards loaded on first use)
+    def __init__(self, directory, kind):
+        if kind not in ("scenarios", "personas"):
+            raise ValueError(f"Unknown catalog kind '{kind}'")
+        with open(os.path.join(directory, "index.json"), "r") as f:
+            self.index = json.load(f)
+        self.directory = directory
+        self.kind = kind
+        self.size = self.index[kind]
+        self.shard_size = self.index["shard_size"]
+        self.vocab = self.index["vocab"]
+        self.shards = {}
+
+    def __len__(self):
+        return self.size
+
+    def columns(self, shard):
+        # all columns of one shard as arrays (for vectorized use)
+        if shard not in self.shards:
+            path = os.path.join(self.directory, f"{self.kind}-{shard:05d}.npz")
+            with np.load(path) as data:
+                self.shards[shard] = {k: data[k] for k in data.files}
+        return self.shards[shard]
+
+    def key(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        if self.kind == "scenarios":
+            return f"scenario_{i:07d}"
+        cols = self.columns(i // self.shard_size)
+        return f"{self.vocab['first_names'][cols['first_name'][i % self.shard_size]]}_{i:07d}"
+
+    def keys(self):
+        for i in range(self.size):
+            yield self.key(i)
+
+    def position(self, key):
+        prefix, _, number = str(key).rpartition("_")
+        if not number.isdigit() or not 0 <= int(number) < self.size:
+            return None
+        i = int(number)
+        if self.key(i) != key:
+            return None
+        return i
+
+    def __contains__(self, key):
+        return self.position(key) is not None
+
+    def __getitem__(self, key):
+        i = self.position(key)
+        if i is None:
+            raise KeyError(key)
+        cols = self.columns(i // self.shard_size)
+        j = i % self.shard_size
+        v = self.vocab
+
+        if self.kind == "personas":
+            personality = (f"{v['tempers'][cols['temper'][j]]}, {v['traits'][cols['trait'][j]]}, "
+                           f"{v['manners'][cols['manner'][j]]}, {v['expertise'][cols['expertise'][j]]} negotiator")
+            return {
+                "name": v["first_names"][cols["first_name"][j]],
+                "personality": personality,
+                "background": v["backgrounds"][cols["background"][j]],
+                "emotion": v["emotions"][cols["emotion"][j]],
+                "discount": float(cols["discount"][j]),
+            }
+
+        t = int(cols["product_type"][j])
+        variant = int(cols["variant"][j])
+        return {
+            "name": v["product_names"][t][variant],
+            "description": v["descriptions"][t][variant],
+            "category": v["categories"][t],
+            "used": int(cols["used"][j]),
+            "condition": v["conditions"][cols["condition"][j]],
+            "avg_new_price": float(cols["avg_new_price"][j]),
+            "avg_similar_price": float(cols["avg_similar_price"][j]),
+            "demand": int(cols["demand"][j]),
+            "supply": int(cols["supply"][j]),
+            "buyer_cost": float(cols["buyer_cost"][j]),
+            "seller_cost": float(cols["seller_cost"][j]),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic scenario and persona catalogs")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--scenarios", required=False, default=10000, type=int, help="Number of scenarios")
+    parser.add_argument("--personas", required=False, default=1000, type=int, help="Number of personas")
+    parser.add_argument("--seed", required=False, default=0, type=int, help="Random seed")
+    parser.add_argument("--shard_size", required=False, default=100_000, type=int, help="Entries per shard")
+    args = parser.parse_args()
+
+    index = write_catalog(args.out, args.scenarios, args.personas, args.seed, args.shard_size)
+    print(f"Wrote {index['scenarios']} scenarios and {index['personas']} personas to {args.out}")
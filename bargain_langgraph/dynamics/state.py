@@ -76,6 +76,15 @@ class State(TypedDict):
     history: List[dict]
     last_message: str | None
 
+def static_attributes(emotion_type, discount_type):
+    # "static"/"dynamic" flags -> list of attributes that stay static (seller_static / buyer_static)
+    static = []
+    if emotion_type == "static":
+        static.append("emotion")
+    if discount_type == "static":
+        static.append("discount")
+    return static
+
 # Note: for seller: "dynamic" means changing according to set transition (non-adaptive)
 # Note: for buyer: "dynamic" would mean changing based on some policy depending on conversation (adaptive)
 
@@ -85,20 +94,26 @@ def get_initial_state(product_name,
                       max_rounds=10,
                       seller_static=None,
                       buyer_static=None,
-                      do_inference=False
+                      do_inference=False,
+                      scenarios=None,
+                      profiles=None
                       )->State:
     # seller_static is list of what stays static, e.g. ["emotion", "discount"] means emotion & discount stays static
+    # scenarios / profiles: mappings to look products / personas up in (e.g. a generated
+    # Catalog, see generator.py); default to the bundled json files
 
     # get product information
-    scenario_path = f"bargain_langgraph/dynamics/scenarios/examples.json"
-    scenarios = load_json(scenario_path)
+    if scenarios is None:
+        scenario_path = f"bargain_langgraph/dynamics/scenarios/examples.json"
+        scenarios = load_json(scenario_path)
     if product_name not in scenarios:
         raise ValueError(f"Scenario '{product_name}' not found")
     product = scenarios[product_name]
 
     # get buyer information
-    profiles_path = "bargain_langgraph/dynamics/profiles/personas.json"
-    profiles = load_json(profiles_path)
+    if profiles is None:
+        profiles_path = "bargain_langgraph/dynamics/profiles/personas.json"
+        profiles = load_json(profiles_path)
     if buyer_name not in profiles:
         raise ValueError(f"Profile with name = '{buyer_name}' not found (for buyer)")
     buyer = profiles[buyer_name]
@@ -108,6 +123,25 @@ def get_initial_state(product_name,
         raise ValueError(f"Profile with name = '{seller_name}' not found (for seller)")
     seller = profiles[seller_name]
 
+    return build_state(product, buyer, seller, buyer_name, seller_name,
+                       max_rounds, seller_static, buyer_static, do_inference)
+
+
+def build_state(product,
+                buyer,
+                seller,
+                buyer_name,
+                seller_name,
+                max_rounds=10,
+                seller_static=None,
+                buyer_static=None,
+                do_inference=False
+                )->State:
+    # product is a scenario dict (schema of scenarios/examples.json)
+    # buyer, seller are persona dicts (schema of profiles/personas.json); a persona's
+    # optional "name" (display name, e.g. of a generated catalog entry) replaces the
+    # lookup key buyer_name / seller_name in the State
+
     # extract static/dynamic buyer seller
     if seller_static is None:
         seller_static = []
@@ -139,8 +173,8 @@ def get_initial_state(product_name,
     state = State(
         round=0,
         max_rounds=max_rounds,
-        buyer_name=buyer_name,
-        seller_name=seller_name,
+        buyer_name=buyer.get("name", buyer_name),
+        seller_name=seller.get("name", seller_name),
         product_name=product["name"],
         product_description=product["description"],
         product_category=product["category"],
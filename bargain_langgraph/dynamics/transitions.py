@@ -113,6 +113,36 @@ def apply_seller_action(state, action, seller_choices):
         return new_state
 
 
+def flatten_history(history):
+    # apply_seller_action stores the round-0 history as a nested list
+    turns = []
+    for entry in history:
+        if isinstance(entry, list):
+            turns.extend(entry)
+        else:
+            turns.append(entry)
+    return turns
+
+
+def increment_round(state):
+    new_state = state.copy()
+    new_state["round"] += 1
+    return new_state
+
+
+def should_continue(state):
+    if state.get("agreement_reached"):
+        return "end"
+
+    if state.get("breakdown", False):
+        return "end"
+
+    if state["round"] >= state["max_rounds"]:
+        return "end"
+
+    return "continue"
+
+
 # def apply_agent_action(state, role, action, message):
 #     if not isinstance(action, dict):
 #         raise TypeError(
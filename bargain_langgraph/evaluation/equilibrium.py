@@ -0,0 +1,175 @@
+from functools import lru_cache
+import numpy as np
+
+from bargain_langgraph.dynamics.emotion_discount import DEFAULT_SELLER_PARAMS
+"""
+Equilibrium benchmark for the finite-horizon game with a dynamic seller discount
+
+The graph plays alternating offers for max_rounds rounds: in round t the seller
+moves (accept the buyer's standing offer, or counter), then the buyer (accept,
+or counter). The seller's round-0 offer is a fixed opening rule, so the buyer is
+the first strategic proposer, and the buyer's counter in the last round is never
+answered. Each rejection costs both sides one period of discounting.
+
+At the start of each seller turn t >= 1 the seller discount is redrawn from the
+transition in emotion_discount.py (update_discount):
+    delta_t ~ Beta(mu * kappa, (1 - mu) * kappa)
+    mu = (1 - rho) sigma(beta0 + beta1 (1 - t/T) + beta2 x) + rho delta_{t-1}
+where x = (buyer offer - seller_cost) / (buyer_cost - seller_cost) is the
+seller's share of the surplus offered by the buyer. Everything is solved in
+shares of the surplus, so the solution does not depend on the costs.
+
+Which discount plays delta_{t-1} is set by previous (as in estimation.py):
+- "state" (default): the discount held in the State. apply_seller_action never
+  writes the drawn discount back, so in this repo every draw conditions on the
+  initial discount delta_0; this is the game actually played
+- "history": the previously drawn discount (the Markov model as documented in
+  emotion_discount.py)
+With "state" the buyer's value no longer depends on the current draw, so B_t
+below is a single number per round.
+
+Backward induction over a discretised discount grid, with B_t(delta) the buyer's
+value of proposing in round t and M_t(delta) = delta (1 - B_t(delta)) the
+seller's value of countering in round t:
+    B_{T-1} = 0
+    U_t(x, delta) = dB E[ 1{x >= M_{t+1}(d')} (1 - x) + 1{x < M_{t+1}(d')} dB B_{t+1}(d') ]
+    B_t(delta) = max(0, max_x U_t(x, delta))
+The benchmark price is the buyer's optimal round-0 offer,
+seller_cost + x* (buyer_cost - seller_cost). Among equally good offers the
+lowest one the seller accepts with the highest probability is chosen (e.g.
+with a seller discount of 1 every offer is worth 0 to the buyer, and the
+benchmark is the full price, not an offer the seller rejects).
+
+With a static seller discount and T -> infinity this recovers Rubinstein's
+price with the buyer proposing first. Solutions are cached per configuration,
+so batch evaluation only solves each distinct one once.
+"""
+
+
+def discount_grid(grid_size):
+    # cell midpoints of (0, 1): avoids the Beta density singularities at 0 and 1
+    return (np.arange(grid_size) + 0.5) / grid_size
+
+
+def transition_matrix(offers, discounts, grid, round, max_rounds, params):
+    # P[x, g, h] = P(delta_round = grid[h] | delta_last = discounts[g], offer share offers[x])
+    beta0, beta1, beta2, rho, kappa = params
+    a = beta0 + beta1 * (1 - round / max_rounds) + beta2 * offers
+    mu = (1 - rho) / (1 + np.exp(-a))[:, None] + rho * discounts[None, :]
+    b1 = (mu * kappa)[:, :, None]
+    b2 = ((1 - mu) * kappa)[:, :, None]
+    log_p = (b1 - 1) * np.log(grid) + (b2 - 1) * np.log1p(-grid)
+    log_p -= log_p.max(axis=2, keepdims=True)
+    p = np.exp(log_p)
+    return p / p.sum(axis=2, keepdims=True)
+
+
+def proposal_values(offers, probs, seller_counter, buyer_next, buyer_discount):
+    # U[x, g] for every candidate offer x and current discount g
+    accept = offers[:, None] >= seller_counter[None, :]
+    inner = np.where(accept,
+                     (1 - offers)[:, None],
+                     buyer_discount * buyer_next[None, :])
+    return buyer_discount * np.einsum("xgh,xh->xg", probs, inner), accept
+
+
+@lru_cache(maxsize=4096)
+def _solve(buyer_discount,
+           seller_discount,
+           dynamic,
+           markov,
+           params,
+           max_rounds,
+           grid_size,
+           offer_grid_size):
+    if max_rounds <= 1:
+        # the buyer's only counter is never answered: the seller gets everything
+        return 1.0, 1.0, 0.0
+
+    if dynamic:
+        grid = discount_grid(grid_size)
+    else:
+        grid = np.array([seller_discount])
+    base_offers = np.linspace(0.0, 1.0, offer_grid_size)
+
+    # last round: the buyer's counter is worthless, so the seller keeps all
+    buyer_value = np.zeros(len(grid))
+    seller_counter = grid * (1 - buyer_value)
+
+    for t in range(max_rounds - 2, -1, -1):
+        # the optimal offer sits at (or just above) one of the seller's thresholds
+        offers = np.unique(np.concatenate([base_offers, np.clip(seller_counter, 0.0, 1.0)]))
+        if t == 0 or not markov:
+            discounts = np.array([seller_discount])
+        else:
+            discounts = grid
+        if dynamic:
+            probs = transition_matrix(offers, discounts, grid, t + 1, max_rounds, params)
+        else:
+            probs = np.ones((len(offers), 1, 1))
+        values, accept = proposal_values(offers, probs, seller_counter, buyer_value, buyer_discount)
+
+        if t == 0:
+            accept_probs = np.einsum("xh,xh->x", probs[:, 0], accept)
+            ties = np.flatnonzero(values[:, 0] >= values[:, 0].max() - 1e-12)
+            # offers are sorted: among ties, most likely accepted, then lowest
+            best = int(ties[np.argmax(accept_probs[ties])])
+            return float(offers[best]), float(accept_probs[best]), float(max(values[best, 0], 0.0))
+
+        buyer_value = np.maximum(values.max(axis=0), 0.0)
+        seller_counter = grid * (1 - buyer_value)
+
+
+def solve_equilibrium(buyer_cost,
+                      seller_cost,
+                      buyer_discount,
+                      seller_discount,
+                      max_rounds,
+                      seller_discount_type="dynamic",
+                      seller_params=None,
+                      previous="state",
+                      grid_size=101,
+                      offer_grid_size=201) -> dict:
+    # previous: "state" or "history", which discount the transition conditions on (see above)
+    if previous not in ("state", "history"):
+        raise ValueError(f"Unknown previous '{previous}' (expected 'state' or 'history')")
+    if seller_params is None:
+        seller_params = DEFAULT_SELLER_PARAMS
+    params = tuple(float(seller_params[k]) for k in ("beta0", "beta1", "beta2", "rho", "kappa"))
+
+    share, accept_prob, buyer_value = _solve(float(buyer_discount),
+                                             float(seller_discount),
+                                             seller_discount_type == "dynamic",
+                                             previous == "history",
+                                             params,
+                                             int(max_rounds),
+                                             grid_size,
+                                             offer_grid_size)
+    gap = buyer_cost - seller_cost
+    return {
+        "price": seller_cost + share * gap,
+        "seller_share": share,
+        "accept_prob": accept_prob,
+        "buyer_value": buyer_value * gap,
+    }
+
+
+def equilibrium_for_state(state: dict, **kwargs) -> dict:
+    return solve_equilibrium(state["buyer_cost"],
+                             state["seller_cost"],
+                             state["buyer_discount"],
+                             state["seller_discount"],
+                             state["max_rounds"],
+                             state["seller_discount_type"],
+                             **kwargs)
+
+
+def batch_equilibrium_prices(states, **kwargs) -> np.ndarray:
+    # equilibrium prices for many episodes; each distinct configuration is solved once
+    shares = np.empty(len(states))
+    for i, state in enumerate(states):
+        shares[i] = equilibrium_for_state({**state, "buyer_cost": 1.0, "seller_cost": 0.0},
+                                          **kwargs)["seller_share"]
+    buyer_cost = np.array([float(state["buyer_cost"]) for state in states])
+    seller_cost = np.array([float(state["seller_cost"]) for state in states])
+    return seller_cost + shares * (buyer_cost - seller_cost)
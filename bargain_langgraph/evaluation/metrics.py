@@ -3,10 +3,22 @@ Simple metrics to evaluate the bargaining process
 1. Whether the bargaining ended in agreement
 2. The number of turns taken
 3. Buyer saving percentage = (seller_initial_price - final_agreed_price) / seller_initial_price
+4. Distance from the infinite-horizon Rubinstein price (static discounts); the
+   seller gets dB (1 - dS) / (1 - dB dS) of the surplus (the original formula,
+   kept for comparability: the responder's share when the seller proposes first)
+5. Distance from the finite-horizon equilibrium with the seller discount transition
+   (see equilibrium.py) - the right benchmark for dynamic sellers and short max_rounds.
+   Here the buyer is the first proposer; with static discounts and many rounds
+   the seller's share tends to dS (1 - dB) / (1 - dB dS)
+So 4. and 5. use opposite proposer conventions: for buyer 0.9, seller 0.5 and
+10 rounds on laptop001 the two prices are 522.7 and 413.7.
 
 """
+from .equilibrium import equilibrium_for_state
 
-def evaluate_conversation(state: dict) -> dict:
+
+def evaluate_conversation(state: dict, seller_params=None) -> dict:
+    # seller_params: fitted seller transition the seller played with (default: DEFAULT_SELLER_PARAMS)
     success = state["agreed_price"] is not None
 
     if not success:
@@ -30,10 +42,26 @@ def evaluate_conversation(state: dict) -> dict:
     equilibrium_price += buyer_discount * (1 - seller_discount) * buyer_cost / (1 - buyer_discount * seller_discount)
     above_eq_pct = (final - equilibrium_price) / equilibrium_price
 
+    # finite horizon, seller discount following its transition (if dynamic)
+    horizon_equilibrium_price = equilibrium_for_state(state, seller_params=seller_params)["price"]
+    above_horizon_eq_pct = (final - horizon_equilibrium_price) / horizon_equilibrium_price
+
     return {
         "success": True,
         "turns": state["round"],
         "buyer_savings_pct": savings_pct,
         "equilibrium_price": equilibrium_price,
-        "above_eq_pct": above_eq_pct
-    }
\ No newline at end of file
+        "above_eq_pct": above_eq_pct,
+        "horizon_equilibrium_price": horizon_equilibrium_price,
+        "above_horizon_eq_pct": above_horizon_eq_pct
+    }
+
+def termination_reason(state: dict) -> str:
+    # why the conversation stopped (mirrors should_continue in transitions.py)
+    if state.get("agreement_reached"):
+        return "agreement"
+    if state.get("breakdown", False):
+        return "breakdown"
+    if state["round"] >= state["max_rounds"]:
+        return "max_rounds"
+    return "incomplete"
@@ -0,0 +1,254 @@
+import bisect
+import json
+import math
+import os
+import sys
+from collections import Counter
+
+from .metrics import termination_reason
+"""
+Streaming aggregation of episode metrics (constant memory per group)
+
+Fed one finished episode at a time (e.g. from a sweep), it keeps per group:
+1. Episode count and number of agreements
+2. Running mean / variance (Welford) of savings %, distance from equilibria and rounds
+3. Quantiles of savings % (streaming P^2 sketches) and of rounds (exact, from
+   a histogram: rounds are small integers bounded by max_rounds, where P^2 is
+   biased)
+4. A histogram of termination reasons ("error" for episodes that failed)
+
+The aggregator can be checkpointed to a JSON file and restored, and queried
+while a sweep is running. From the shell:
+    python -m bargain_langgraph.evaluation.streaming <checkpoint.json>
+"""
+
+MEAN_METRICS = ["buyer_savings_pct", "above_eq_pct", "above_horizon_eq_pct", "turns"]
+QUANTILE_METRICS = ["buyer_savings_pct"]
+QUANTILES = [0.1, 0.5, 0.9]
+
+
+class RunningStats:
+    # Welford's online mean / variance
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    def to_dict(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.n, stats.mean, stats.m2 = d["n"], d["mean"], d["m2"]
+        return stats
+
+
+class P2Quantile:
+    # P^2 quantile estimator (Jain & Chlamtac, 1985): five markers, O(1) memory
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        self.n += 1
+        q = self.heights
+        if self.n <= 5:
+            bisect.insort(q, x)
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        n = self.positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # piecewise-parabolic prediction, linear if it leaves the bracket
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        if self.n == 0:
+            return math.nan
+        if self.n <= 5:
+            # exact (linear interpolation) on the few values seen
+            idx = self.p * (self.n - 1)
+            lo = int(math.floor(idx))
+            hi = min(lo + 1, self.n - 1)
+            return self.heights[lo] + (idx - lo) * (self.heights[hi] - self.heights[lo])
+        return self.heights[2]
+
+    def to_dict(self):
+        return {"p": self.p, "n": self.n, "heights": self.heights,
+                "positions": self.positions, "desired": self.desired}
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d["p"])
+        sketch.n = d["n"]
+        sketch.heights = list(d["heights"])
+        sketch.positions = list(d["positions"])
+        sketch.desired = list(d["desired"])
+        return sketch
+
+
+def histogram_quantile(counts, p):
+    # smallest value whose cumulative count reaches p of the total (inverted CDF)
+    total = sum(counts.values())
+    if total == 0:
+        return math.nan
+    cumulative = 0
+    for value in sorted(counts):
+        cumulative += counts[value]
+        if cumulative >= p * total:
+            return value
+    return max(counts)
+
+
+class GroupStats:
+    def __init__(self):
+        self.episodes = 0
+        self.successes = 0
+        self.means = {m: RunningStats() for m in MEAN_METRICS}
+        self.quantiles = {m: [P2Quantile(p) for p in QUANTILES] for m in QUANTILE_METRICS}
+        self.turns = Counter()
+        self.reasons = Counter()
+
+    def update(self, metrics, reason):
+        self.episodes += 1
+        self.reasons[reason] += 1
+        if metrics is None:
+            # failed episode: only counted in the termination reasons
+            return
+        self.successes += int(metrics["success"])
+        for m in MEAN_METRICS:
+            value = metrics.get(m)
+            if value is not None:
+                self.means[m].update(float(value))
+        for m in QUANTILE_METRICS:
+            value = metrics.get(m)
+            if value is not None:
+                for sketch in self.quantiles[m]:
+                    sketch.update(float(value))
+        self.turns[int(metrics["turns"])] += 1
+
+    def summary(self):
+        completed = self.episodes - self.reasons["error"]
+        return {
+            "episodes": self.episodes,
+            "successes": self.successes,
+            "success_rate": self.successes / completed if completed else math.nan,
+            "mean": {m: s.mean if s.n else math.nan for m, s in self.means.items()},
+            "std": {m: math.sqrt(s.variance()) for m, s in self.means.items()},
+            "quantiles": {**{m: {str(sk.p): sk.value() for sk in sketches}
+                             for m, sketches in self.quantiles.items()},
+                          "turns": {str(p): histogram_quantile(self.turns, p) for p in QUANTILES}},
+            "turns_histogram": dict(sorted(self.turns.items())),
+            "termination_reasons": dict(self.reasons),
+        }
+
+    def to_dict(self):
+        return {
+            "episodes": self.episodes,
+            "successes": self.successes,
+            "means": {m: s.to_dict() for m, s in self.means.items()},
+            "quantiles": {m: [sk.to_dict() for sk in sketches] for m, sketches in self.quantiles.items()},
+            "turns": dict(self.turns),
+            "reasons": dict(self.reasons),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        group = cls()
+        group.episodes = d["episodes"]
+        group.successes = d["successes"]
+        group.means = {m: RunningStats.from_dict(s) for m, s in d["means"].items()}
+        group.quantiles = {m: [P2Quantile.from_dict(sk) for sk in d["quantiles"][m]]
+                           for m in QUANTILE_METRICS}
+        # JSON keys are strings
+        group.turns = Counter({int(t): c for t, c in d.get("turns", {}).items()})
+        group.reasons = Counter(d["reasons"])
+        return group
+
+
+class StreamingAggregator:
+    def __init__(self, checkpoint_path=None, checkpoint_every=50):
+        # checkpoint_path: JSON file rewritten every checkpoint_every episodes
+        self.groups = {}
+        self.episodes = 0
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+
+    def add(self, final_state, metrics, group="all"):
+        # final_state / metrics None: the episode failed
+        if group not in self.groups:
+            self.groups[group] = GroupStats()
+        reason = "error" if final_state is None else termination_reason(final_state)
+        self.groups[group].update(metrics, reason)
+        self.episodes += 1
+        if self.checkpoint_path is not None and self.episodes % self.checkpoint_every == 0:
+            self.checkpoint()
+
+    def summary(self, group=None):
+        if group is not None:
+            return self.groups[group].summary()
+        return {key: g.summary() for key, g in self.groups.items()}
+
+    def checkpoint(self, path=None):
+        path = path or self.checkpoint_path
+        data = {
+            "episodes": self.episodes,
+            "groups": {key: g.to_dict() for key, g in self.groups.items()},
+        }
+        # write-then-rename so readers never see a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, checkpoint_every=50):
+        with open(path, "r") as f:
+            data = json.load(f)
+        aggregator = cls(checkpoint_path=path, checkpoint_every=checkpoint_every)
+        aggregator.episodes = data["episodes"]
+        aggregator.groups = {key: GroupStats.from_dict(g) for key, g in data["groups"].items()}
+        return aggregator
+
+
+if __name__ == "__main__":
+    aggregator = StreamingAggregator.load(sys.argv[1])
+    print(f"Episodes so far: {aggregator.episodes}")
+    for key, summary in aggregator.summary().items():
+        print(f"\n{key}")
+        print(json.dumps(summary, indent=2))
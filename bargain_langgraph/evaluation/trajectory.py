@@ -0,0 +1,211 @@
+import glob
+import json
+import os
+import re
+import numpy as np
+
+from bargain_langgraph.dynamics.transitions import flatten_history
+"""
+Concession-dynamics metrics computed over the offer trajectories in history
+
+Histories of many episodes are packed once into padded arrays
+(episodes x turns), and every metric is then computed for all episodes at
+once with NumPy:
+1. Concession rate per side: mean concession per own offer, as a fraction of
+   the surplus (buyer_cost - seller_cost); the first offer has no concession
+2. Concession-size profile: concession of the k-th own offer, per episode
+3. Time to convergence: first turn at which the standing offers are within
+   converge_tol dollars of each other (or an offer is accepted)
+4. Number of non-price turns (ponder / chitchat)
+5. Offer reversals: own offers moving away from the other side
+   (seller raising, buyer lowering its price)
+6. Rule violations: buyer offers above buyer_cost, and offers whose message
+   states the wrong direction for the speaker's own price (e.g. "I can lower
+   my price" with a price increase). Requests to the other side ("could you
+   go lower?") are not statements about the own offer and are ignored
+"""
+
+ACTIONS = {"offer": 0, "accept": 1, "ponder": 2, "chitchat": 3, "chit-chat": 3, "breakdown": 4}
+OFFER, ACCEPT, PONDER, CHITCHAT, BREAKDOWN, OTHER = 0, 1, 2, 3, 4, 5
+SELLER, BUYER, PAD = 0, 1, -1
+
+INCREASE_WORDS = ("increas", "rais", "higher", "go up", "going up")
+DECREASE_WORDS = ("lower", "decreas", "reduc", "drop", "come down", "coming down")
+
+# the speaker (or their offer), at most three words, then a direction word:
+# "I can lower", "I'll come down", "my offer is higher", "we're raising"
+OWN_DIRECTION = re.compile(
+    r"\b(?:i|we|my (?:offer|price|bid)|our (?:offer|price|bid))\b"
+    r"(?P<gap>(?:\W+\w+){0,3}?)\W+"
+    r"(?P<word>" + "|".join(w.replace(" ", r"\s+") for w in INCREASE_WORDS + DECREASE_WORDS) + r")")
+# gap words that turn it into a refusal or a statement about the other side
+NOT_OWN = {"not", "t", "never", "cannot", "you", "your"}
+
+
+def stated_direction(message):
+    # +1 if the message says the speaker's own price goes up, -1 if it goes down, 0 otherwise
+    if not message:
+        return 0
+    up = down = 0
+    for match in OWN_DIRECTION.finditer(message.lower()):
+        if NOT_OWN.intersection(re.findall(r"\w+", match["gap"])):
+            continue
+        if " ".join(match["word"].split()).startswith(INCREASE_WORDS):
+            up = 1
+        else:
+            down = 1
+    return up - down
+
+
+def load_saved_conversations(directory):
+    # conversation files written by runner.py --save_to
+    records = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, "r") as f:
+            records.append(json.load(f))
+    return records
+
+
+def episode_costs(record):
+    # record: a final State, or a conversation saved by runner.py
+    source = record.get("initial_state", record)
+    return float(source["buyer_cost"]), float(source["seller_cost"])
+
+
+def pack_histories(records) -> dict:
+    histories = [flatten_history(record["history"]) for record in records]
+    n = len(histories)
+    width = max((len(h) for h in histories), default=0)
+
+    # one pass over the turns into flat lists, then a single scatter per array
+    turns = [turn for history in histories for turn in history]
+    lengths = np.array([len(h) for h in histories], dtype=np.int64)
+    rows = np.repeat(np.arange(n), lengths)
+    cols = np.arange(len(turns)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    role = np.full((n, width), PAD, dtype=np.int8)
+    action = np.full((n, width), OTHER, dtype=np.int8)
+    price = np.full((n, width), np.nan)
+    direction = np.zeros((n, width), dtype=np.int8)
+    role[rows, cols] = [BUYER if turn["role"] == "buyer" else SELLER for turn in turns]
+    action[rows, cols] = [ACTIONS.get(str(turn["action"]).lower(), OTHER) for turn in turns]
+    price[rows, cols] = [np.nan if turn.get("price") is None else float(turn["price"]) for turn in turns]
+    direction[rows, cols] = [stated_direction(turn.get("message")) for turn in turns]
+
+    costs = np.array([episode_costs(record) for record in records]).reshape(n, 2)
+    return {
+        "role": role,
+        "action": action,
+        "price": price,
+        "direction": direction,
+        "length": lengths,
+        "buyer_cost": costs[:, 0],
+        "seller_cost": costs[:, 1],
+    }
+
+
+def forward_fill_index(mask):
+    # index of the last True at or before each turn (-1 if none)
+    idx = np.where(mask, np.arange(mask.shape[1])[None, :], -1)
+    return np.maximum.accumulate(idx, axis=1)
+
+
+def take_index(values, idx):
+    out = np.take_along_axis(values, np.maximum(idx, 0), axis=1)
+    return np.where(idx >= 0, out, np.nan)
+
+
+def left_align(values, valid, width=None):
+    # compact the valid entries of each row to the left (nan padded)
+    rank = np.cumsum(valid, axis=1) - 1
+    if width is None:
+        width = int(valid.sum(axis=1).max(initial=0))
+    out = np.full((values.shape[0], width), np.nan)
+    rows, cols = np.nonzero(valid)
+    out[rows, rank[rows, cols]] = values[rows, cols]
+    return out
+
+
+def side_offers(packed, side):
+    # own offers of one side, and the change since that side's previous offer
+    role, action, price = packed["role"], packed["action"], packed["price"]
+    mask = (role == side) & (action == OFFER) & ~np.isnan(price)
+    last = forward_fill_index(mask)
+    previous = np.concatenate([np.full((mask.shape[0], 1), -1), last[:, :-1]], axis=1)
+    change = price - take_index(price, previous)
+    change = np.where(mask, change, np.nan)
+    return mask, last, change
+
+
+def trajectory_metrics(packed, converge_tol=10.0) -> dict:
+    action, price = packed["action"], packed["price"]
+    surplus = (packed["buyer_cost"] - packed["seller_cost"])[:, None]
+
+    seller_mask, seller_last, seller_change = side_offers(packed, SELLER)
+    buyer_mask, buyer_last, buyer_change = side_offers(packed, BUYER)
+
+    # concessions: seller lowers, buyer raises (as a fraction of the surplus)
+    seller_concession = -seller_change / surplus
+    buyer_concession = buyer_change / surplus
+    seller_valid = ~np.isnan(seller_concession)
+    buyer_valid = ~np.isnan(buyer_concession)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        seller_rate = np.nansum(seller_concession, axis=1) / seller_valid.sum(axis=1)
+        buyer_rate = np.nansum(buyer_concession, axis=1) / buyer_valid.sum(axis=1)
+
+    # convergence of the standing offers
+    gap = take_index(price, seller_last) - take_index(price, buyer_last)
+    converged = (gap <= converge_tol) | (action == ACCEPT)
+    time_to_convergence = np.where(converged.any(axis=1), converged.argmax(axis=1), np.nan)
+
+    # rule violations
+    buyer_above_cost = buyer_mask & (price > packed["buyer_cost"][:, None])
+    change = np.where(seller_mask, seller_change, buyer_change)
+    misstated = (packed["direction"] != 0) & (np.sign(change) != 0) \
+        & (np.sign(change) != packed["direction"]) & ~np.isnan(change)
+
+    return {
+        "seller_concession_rate": seller_rate,
+        "buyer_concession_rate": buyer_rate,
+        "seller_concessions": left_align(seller_concession, seller_valid),
+        "buyer_concessions": left_align(buyer_concession, buyer_valid),
+        "time_to_convergence": time_to_convergence,
+        "non_price_turns": ((action == PONDER) | (action == CHITCHAT)).sum(axis=1),
+        "seller_reversals": (seller_concession < 0).sum(axis=1),
+        "buyer_reversals": (buyer_concession < 0).sum(axis=1),
+        "buyer_above_cost": buyer_above_cost.sum(axis=1),
+        "misstated_direction": misstated.sum(axis=1),
+    }
+
+
+def concession_profile(metrics) -> dict:
+    # mean concession size by own-offer index, over episodes
+    with np.errstate(invalid="ignore"):
+        return {
+            "seller": np.nanmean(metrics["seller_concessions"], axis=0),
+            "buyer": np.nanmean(metrics["buyer_concessions"], axis=0),
+        }
+
+
+def summarize_trajectories(metrics) -> dict:
+    # corpus-level means of the per-episode metrics
+    summary = {}
+    for key, values in metrics.items():
+        if values.ndim == 1:
+            summary[key] = float(np.nanmean(values)) if np.any(~np.isnan(values)) else None
+    return summary
+
+
+if __name__ == "__main__":
+    # python -m bargain_langgraph.evaluation.trajectory <directory of saved conversations>
+    import sys
+
+    records = load_saved_conversations(sys.argv[1])
+    metrics = trajectory_metrics(pack_histories(records))
+    print(f"Conversations: {len(records)}")
+    for key, value in summarize_trajectories(metrics).items():
+        print(f"{key}: {value}")
+    profile = concession_profile(metrics)
+    print(f"Seller concession profile: {np.round(profile['seller'], 4).tolist()}")
+    print(f"Buyer concession profile: {np.round(profile['buyer'], 4).tolist()}")
@@ -0,0 +1,96 @@
+import math
+
+from bargain_langgraph.agents.buyer import BuyerAgent
+from bargain_langgraph.agents.seller import SellerAgent
+from bargain_langgraph.agents.cascade import ModelCascade, DEFAULT_POLICY
+from .sweep import run_sweep, metric_value, half_width
+"""
+Compare a model cascade against the all-strong-model baseline
+
+The same cells are run twice: once with the cascade, once with every turn on
+the strong model (mode "strong", so latency and tokens are measured the same
+way). The report gives, per arm, outcome metrics with confidence intervals and
+the routing cost (strong share, mean turn latency, tokens, $ if prices are
+given), plus the cascade - baseline difference of each outcome metric.
+"""
+
+REPORT_METRICS = ["success", "turns", "buyer_savings_pct", "above_eq_pct", "above_horizon_eq_pct"]
+
+
+def outcome_stats(metrics, confidence=0.95) -> dict:
+    stats = {}
+    for metric in REPORT_METRICS:
+        values = [metric_value(m, metric) for m in metrics]
+        values = [v for v in values if v is not None]
+        stats[metric] = {
+            "n": len(values),
+            "mean": sum(values) / len(values) if values else None,
+            "half_width": half_width(values, metric, confidence),
+        }
+    return stats
+
+
+def compare_cascade(cells,
+                    cheap_llm,
+                    strong_llm,
+                    buyer_prompt,
+                    seller_prompt,
+                    repeats=5,
+                    policy=None,
+                    prices=None,
+                    confidence=0.95,
+                    max_workers=1,
+                    engine="langgraph",
+                    buyer_turn=None,
+                    seller_turn=None) -> dict:
+    # buyer_turn / seller_turn: turn templates for chat prompt mode (the prompts
+    # are then the system templates), None for single-message prompts
+    arms = {}
+    for arm, mode in (("cascade", "cascade"), ("strong", "strong")):
+        router = ModelCascade(cheap_llm, strong_llm, {**(policy or {}), "mode": mode}, prices=prices)
+        by_cell = run_sweep(cells,
+                            BuyerAgent(llm=router, prompt_template=buyer_prompt, turn_template=buyer_turn),
+                            SellerAgent(llm=router, prompt_template=seller_prompt, turn_template=seller_turn),
+                            repeats=repeats,
+                            max_workers=max_workers,
+                            engine=engine)
+        metrics = [m for cell_metrics in by_cell.values() for m in cell_metrics]
+        arms[arm] = {
+            "episodes": len(metrics),
+            "outcomes": outcome_stats(metrics, confidence),
+            "routing": router.summary(),
+        }
+
+    difference = {}
+    for metric in REPORT_METRICS:
+        a, b = arms["cascade"]["outcomes"][metric], arms["strong"]["outcomes"][metric]
+        if a["mean"] is None or b["mean"] is None:
+            continue
+        difference[metric] = {
+            "estimate": a["mean"] - b["mean"],
+            "half_width": math.sqrt(a["half_width"] ** 2 + b["half_width"] ** 2),
+        }
+    return {"policy": {**DEFAULT_POLICY, **(policy or {})}, "arms": arms, "difference": difference}
+
+
+def format_report(report) -> str:
+    lines = ["=== Cascade vs strong-model baseline ==="]
+    for arm, result in report["arms"].items():
+        routing = result["routing"]
+        lines.append(f"\n[{arm}] {result['episodes']} episodes, {routing['turns']} LLM turns")
+        for metric, s in result["outcomes"].items():
+            if s["mean"] is not None:
+                lines.append(f"  {metric}: {s['mean']:.4f} +/- {s['half_width']:.4f} (n={s['n']})")
+        if routing["turns"]:
+            lines.append(f"  strong share: {routing['strong_share']:.3f} | "
+                         f"mean turn latency: {routing['mean_turn_latency']:.3f}s")
+        lines.append(f"  escalation reasons: {routing['reasons']}")
+        for tier, t in routing["tokens"].items():
+            lines.append(f"  {tier}: {t['calls']} calls, {t['input_tokens']} in / {t['output_tokens']} out tokens")
+        if "cost" in routing:
+            lines.append(f"  cost: ${routing['cost']:.4f}")
+
+    lines.append("\n[cascade - strong]")
+    for metric, d in report["difference"].items():
+        lines.append(f"  {metric}: {d['estimate']:+.4f} +/- {d['half_width']:.4f}")
+    return "\n".join(lines)
@@ -0,0 +1,290 @@
+import itertools
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from statistics import NormalDist
+
+from bargain_langgraph.dynamics.state import get_initial_state, static_attributes
+from bargain_langgraph.graph.bargaining_graph import build_bargaining_graph
+from bargain_langgraph.evaluation.metrics import evaluate_conversation
+from bargain_langgraph.profiling import phase
+"""
+Parameter sweeps over bargaining episodes
+
+A sweep is a list of cells (dicts of runner arguments, see make_grid). Two modes:
+- run_sweep: a fixed number of repeats per cell
+- run_adaptive_sweep: episodes are run in waves until every cell's confidence
+  interval on a metric is narrower than a target (or the budget runs out);
+  after each wave the next one goes to the cells furthest from the target
+
+Metrics are those of evaluate_conversation. "success" is treated as a
+proportion (Wilson interval); any other metric as a mean over the episodes
+where it is defined (normal interval). A cell whose metric is still undefined
+(no interval yet) after min_episodes episodes without a value, e.g.
+above_eq_pct in a cell that never reaches agreement, is marked undefined and
+gets no more episodes.
+
+Both modes accept a StreamingAggregator (evaluation/streaming.py), fed as each
+episode finishes. An episode that raises (e.g. an unparsable LLM reply) is
+recorded as failed, with final_state / metrics None and the error message,
+and the sweep goes on.
+"""
+
+CELL_DEFAULTS = {
+    "max_rounds": 10,
+    "buyer_emotion": None,
+    "seller_emotion": None,
+    "buyer_discount": None,
+    "seller_discount": None,
+    "seller_emotion_type": "static",
+    "seller_discount_type": "static",
+    "buyer_emotion_type": "static",
+    "buyer_discount_type": "static",
+    "buyer_inference": False,
+}
+
+
+def make_grid(**axes) -> list[dict]:
+    # make_grid(product_name=["laptop001"], buyer_emotion=["anger", "joy"], ...)
+    # -> one cell per combination, missing arguments take CELL_DEFAULTS
+    names = list(axes)
+    cells = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        cell = dict(CELL_DEFAULTS)
+        cell.update(zip(names, values))
+        cells.append(cell)
+    return cells
+
+
+def cell_key(cell: dict) -> str:
+    return "|".join(f"{k}={cell[k]}" for k in sorted(cell) if cell[k] is not None)
+
+
+def cell_state(cell: dict):
+    cell = {**CELL_DEFAULTS, **cell}
+    state = get_initial_state(cell["product_name"],
+                              cell["buyer_name"],
+                              cell["seller_name"],
+                              int(cell["max_rounds"]),
+                              static_attributes(cell["seller_emotion_type"], cell["seller_discount_type"]),
+                              static_attributes(cell["buyer_emotion_type"], cell["buyer_discount_type"]),
+                              cell["buyer_inference"])
+
+    # if emotions/discounts are provided, override these in the state
+    for key in ("buyer_emotion", "seller_emotion"):
+        if cell[key] is not None:
+            state[key] = cell[key]
+    for key in ("buyer_discount", "seller_discount"):
+        if cell[key] is not None:
+            state[key] = float(cell[key])
+    return state
+
+
+def run_episode(cell, graph, seller_params=None) -> dict:
+    # seller_params: the seller agent's fitted transition, for the equilibrium benchmark
+    initial_state = cell_state(cell)
+    try:
+        with phase("episode"):
+            final_state = graph.invoke(initial_state)
+        metrics = evaluate_conversation(final_state, seller_params)
+    except Exception as e:
+        return {
+            "cell": cell,
+            "initial_state": initial_state,
+            "final_state": None,
+            "metrics": None,
+            "error": f"{type(e).__name__}: {e}",
+        }
+    return {
+        "cell": cell,
+        "initial_state": initial_state,
+        "final_state": final_state,
+        "metrics": metrics,
+    }
+
+
+def run_episodes(jobs, graph, max_workers=1, on_episode=None, aggregator=None, seller_params=None) -> list[dict]:
+    # jobs: list of cells, one per episode
+    # on_episode / aggregator are fed as each episode finishes
+    def finished(result):
+        if aggregator is not None:
+            aggregator.add(result["final_state"], result["metrics"], cell_key(result["cell"]))
+        if on_episode is not None:
+            on_episode(result)
+
+    if max_workers > 1:
+        results = [None] * len(jobs)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run_episode, cell, graph, seller_params): i
+                       for i, cell in enumerate(jobs)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                finished(results[futures[future]])
+        return results
+
+    results = []
+    for cell in jobs:
+        results.append(run_episode(cell, graph, seller_params))
+        finished(results[-1])
+    return results
+
+
+# -------------------------
+# Confidence intervals
+# -------------------------
+def metric_value(metrics, metric):
+    if metric == "success":
+        return float(metrics["success"])
+    return metrics.get(metric)
+
+
+def half_width(values, metric, confidence=0.95) -> float:
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    n = len(values)
+    if metric == "success":
+        if n == 0:
+            return math.inf
+        p = sum(values) / n
+        return z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    if n < 2:
+        return math.inf
+    mean = sum(values) / n
+    var = sum((v - mean) ** 2 for v in values) / (n - 1)
+    return z * math.sqrt(var / n)
+
+
+def cell_summary(cell, values, episodes, metric, target, confidence, min_episodes=None) -> dict:
+    hw = half_width(values, metric, confidence)
+    missing = episodes - len(values)
+    return {
+        "cell": cell,
+        "episodes": episodes,
+        "n": len(values),
+        "missing": missing,
+        "estimate": sum(values) / len(values) if values else None,
+        "half_width": hw,
+        "met": hw <= target,
+        # no interval yet, and min_episodes episodes gave no value: give up on the cell
+        "undefined": min_episodes is not None and math.isinf(hw) and missing >= min_episodes,
+    }
+
+
+# -------------------------
+# Sweeps
+# -------------------------
+def run_sweep(cells,
+              buyer_agent,
+              seller_agent,
+              repeats=5,
+              max_workers=1,
+              on_episode=None,
+              aggregator=None,
+              engine="langgraph") -> dict:
+    graph = build_bargaining_graph(buyer_agent=buyer_agent, seller_agent=seller_agent, engine=engine)
+    jobs = [cell for cell in cells for _ in range(repeats)]
+    results = run_episodes(jobs, graph, max_workers, on_episode, aggregator,
+                           getattr(seller_agent, "seller_params", None))
+    # metrics of the completed episodes (failed ones reach on_episode / aggregator)
+    by_cell = {cell_key(cell): [] for cell in cells}
+    for result in results:
+        if result["metrics"] is not None:
+            by_cell[cell_key(result["cell"])].append(result["metrics"])
+    return by_cell
+
+
+def allocate_wave(stats, wave_size, target, min_episodes) -> dict:
+    # split wave_size episodes over the cells that miss the target, in
+    # proportion to the episodes each is projected to still need
+    # (half-width shrinks like 1/sqrt(n)); ties go to the widest intervals
+    needed = {}
+    for key, s in stats.items():
+        if s["met"] or s["undefined"]:
+            continue
+        if math.isinf(s["half_width"]) or s["n"] == 0:
+            needed[key] = min_episodes
+        else:
+            needed[key] = max(1, math.ceil(s["n"] * (s["half_width"] / target) ** 2) - s["n"])
+    if not needed:
+        return {}
+
+    total = sum(needed.values())
+    alloc = {key: min(n, wave_size * n // total) for key, n in needed.items()}
+    order = sorted(needed, key=lambda k: -stats[k]["half_width"])
+    left = wave_size - sum(alloc.values())
+    while left > 0:
+        progressed = False
+        for key in order:
+            if left == 0:
+                break
+            if alloc[key] < needed[key]:
+                alloc[key] += 1
+                left -= 1
+                progressed = True
+        if not progressed:
+            break
+    return {key: n for key, n in alloc.items() if n > 0}
+
+
+def run_adaptive_sweep(cells,
+                       buyer_agent,
+                       seller_agent,
+                       metric="above_eq_pct",
+                       target=0.02,
+                       budget=500,
+                       wave_size=50,
+                       min_episodes=5,
+                       confidence=0.95,
+                       max_workers=1,
+                       on_episode=None,
+                       aggregator=None,
+                       engine="langgraph") -> dict:
+    # target: confidence interval half-width to reach on metric in every cell
+    # budget: maximum total number of episodes
+    graph = build_bargaining_graph(buyer_agent=buyer_agent, seller_agent=seller_agent, engine=engine)
+    seller_params = getattr(seller_agent, "seller_params", None)
+    cells_by_key = {cell_key(cell): cell for cell in cells}
+    values = {key: [] for key in cells_by_key}
+    episodes = {key: 0 for key in cells_by_key}
+    failed = {key: 0 for key in cells_by_key}
+    used = 0
+    waves = 0
+
+    def summarize():
+        return {key: {**cell_summary(cells_by_key[key], values[key], episodes[key],
+                                     metric, target, confidence, min_episodes),
+                      "failed": failed[key]}
+                for key in cells_by_key}
+
+    # pilot wave: min_episodes per cell
+    alloc = {key: min_episodes for key in cells_by_key}
+    while alloc and used < budget:
+        jobs = []
+        for key, n in alloc.items():
+            n = min(n, budget - used - len(jobs))
+            jobs.extend([cells_by_key[key]] * n)
+        for result in run_episodes(jobs, graph, max_workers, on_episode, aggregator, seller_params):
+            key = cell_key(result["cell"])
+            episodes[key] += 1
+            if result["metrics"] is None:
+                # failed episode: counts as an episode without a value
+                failed[key] += 1
+                continue
+            value = metric_value(result["metrics"], metric)
+            if value is not None:
+                values[key].append(value)
+        used += len(jobs)
+        waves += 1
+
+        stats = summarize()
+        alloc = allocate_wave(stats, min(wave_size, budget - used), target, min_episodes)
+
+    stats = summarize()
+    # undefined cells are reported apart and do not count against all_met
+    return {
+        "metric": metric,
+        "target": target,
+        "episodes_used": used,
+        "waves": waves,
+        "all_met": all(s["met"] for s in stats.values() if not s["undefined"]),
+        "cells": {key: s for key, s in stats.items() if not s["undefined"]},
+        "undefined_cells": {key: s for key, s in stats.items() if s["undefined"]},
+    }
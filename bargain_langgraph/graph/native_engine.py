@@ -0,0 +1,49 @@
+from bargain_langgraph.dynamics.transitions import (apply_buyer_action, apply_seller_action,
+                                                     increment_round, should_continue)
+from bargain_langgraph.profiling import active
+from .nodes import make_nodes
+"""
+Plain Python turn loop, equivalent to the graph of build_bargaining_graph
+Same node order (seller -> buyer -> round), same stop conditions
+(should_continue) and same transitions, without LangGraph's per-step channel
+bookkeeping. Use it for LLM-free or cached runs where orchestration overhead
+matters: build_bargaining_graph(..., engine="native").
+"""
+
+class NativeBargainingEngine:
+    def __init__(self, buyer_agent, seller_agent):
+        self.buyer_agent = buyer_agent
+        self.seller_agent = seller_agent
+        # profiled node functions (see profiling.py), built on the first invoke
+        # while profiling is on
+        self.nodes = None
+
+    def invoke(self, state, config=None):
+        # config is accepted for call compatibility with a compiled graph and ignored
+        if active():
+            return self.invoke_nodes(state)
+        state = dict(state)
+        while True:
+            # seller turn
+            action, seller_choices = self.seller_agent.act(state)
+            state = apply_seller_action(state, action, seller_choices)
+
+            # buyer turn
+            action, inference, buyer_choices = self.buyer_agent.act(state)
+            state = apply_buyer_action(state, action, inference, buyer_choices)
+
+            # round increment
+            state = increment_round(state)
+            if should_continue(state) == "end":
+                return state
+
+    def invoke_nodes(self, state):
+        if self.nodes is None:
+            self.nodes = make_nodes(self.buyer_agent, self.seller_agent)
+        state = dict(state)
+        while True:
+            state = self.nodes["seller"](state)
+            state = self.nodes["buyer"](state)
+            state = self.nodes["round"](state)
+            if should_continue(state) == "end":
+                return state
@@ -0,0 +1,35 @@
+from bargain_langgraph.dynamics.transitions import (apply_buyer_action, apply_seller_action,
+                                                     increment_round)
+from bargain_langgraph.profiling import profiled
+"""
+Node functions shared by the LangGraph and native engines
+If profiling is on when they are built (see profiling.py), each node, the
+agents' act and the transitions are wrapped in phases; otherwise they are the
+plain functions.
+"""
+
+def make_nodes(buyer_agent, seller_agent) -> dict:
+    seller_act = profiled("act", seller_agent.act)
+    buyer_act = profiled("act", buyer_agent.act)
+    seller_transition = profiled("transition", apply_seller_action)
+    buyer_transition = profiled("transition", apply_buyer_action)
+
+    # -------------------------
+    # Seller turn
+    # -------------------------
+    def seller_node(state):
+        action, seller_choices = seller_act(state)
+        return seller_transition(state, action, seller_choices)
+
+    # -------------------------
+    # Buyer turn
+    # -------------------------
+    def buyer_node(state):
+        action, inference, buyer_choices = buyer_act(state)
+        return buyer_transition(state, action, inference, buyer_choices)
+
+    return {
+        "seller": profiled("seller", seller_node),
+        "buyer": profiled("buyer", buyer_node),
+        "round": profiled("round", increment_round),
+    }
@@ -0,0 +1,77 @@
+import copy
+import itertools
+import time
+import numpy as np
+
+from bargain_langgraph.agents.rule import RuleBuyerAgent, RuleSellerAgent
+from bargain_langgraph.dynamics.state import get_initial_state, static_attributes
+from .bargaining_graph import build_bargaining_graph
+"""
+Parity check between the LangGraph executor and the native engine
+
+For every case both engines are run from the same initial state with
+identically seeded rule agents (and the same global NumPy seed, used by the
+dynamic seller transition); final states, histories included, must match.
+tests/test_engine_parity.py runs the check under pytest; the script below
+also prints the throughput of both engines:
+
+    python -m bargain_langgraph.graph.parity
+"""
+
+CASES = {
+    "product_name": ["laptop001"],
+    "buyer_name": ["Ravi", "Leah"],
+    "seller_type": ["static", "dynamic"],
+    "max_rounds": [1, 3, 10],
+    "noise": [0.0, 0.05],
+    "concession": [0.05, 0.3],
+}
+
+
+def run_case(engine, case, seed):
+    np.random.seed(seed)
+    buyer_agent = RuleBuyerAgent(concession=case["concession"], noise=case["noise"], seed=seed)
+    seller_agent = RuleSellerAgent(concession=case["concession"], noise=case["noise"], seed=seed + 1)
+    graph = build_bargaining_graph(buyer_agent, seller_agent, engine=engine)
+    state = get_initial_state(case["product_name"],
+                              case["buyer_name"],
+                              "Leah",
+                              case["max_rounds"],
+                              static_attributes(case["seller_type"], case["seller_type"]),
+                              ["emotion", "discount"])
+    return graph.invoke(copy.deepcopy(state))
+
+
+def check_engine_parity(seeds=range(5)) -> list:
+    # returns the (case, seed) pairs whose final states differ (empty if all match)
+    names = list(CASES)
+    mismatches = []
+    for values in itertools.product(*(CASES[name] for name in names)):
+        case = dict(zip(names, values))
+        for seed in seeds:
+            expected = run_case("langgraph", case, seed)
+            actual = run_case("native", case, seed)
+            if expected != actual:
+                mismatches.append((case, seed))
+    return mismatches
+
+
+def throughput(engine, episodes=200):
+    case = {"product_name": "laptop001", "buyer_name": "Ravi", "seller_type": "dynamic",
+            "max_rounds": 10, "noise": 0.05, "concession": 0.05}
+    start = time.perf_counter()
+    for seed in range(episodes):
+        run_case(engine, case, seed)
+    return episodes / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    mismatches = check_engine_parity()
+    n_cases = np.prod([len(v) for v in CASES.values()]) * 5
+    if mismatches:
+        for case, seed in mismatches:
+            print(f"MISMATCH seed={seed}: {case}")
+        raise SystemExit(f"{len(mismatches)} of {n_cases} runs differ between engines")
+    print(f"All {n_cases} runs identical between langgraph and native engines")
+    for engine in ("langgraph", "native"):
+        print(f"{engine}: {throughput(engine):.1f} episodes/s (rule agents)")
@@ -0,0 +1,341 @@
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from bargain_langgraph.dynamics.state import build_state
+from bargain_langgraph.dynamics.transitions import (apply_buyer_action, apply_seller_action,
+                                                     increment_round, should_continue)
+from bargain_langgraph.evaluation.metrics import evaluate_conversation, termination_reason
+from .matching import Matcher
+from .scheduler import EventScheduler
+"""
+Marketplace simulation: many buyers and sellers, many concurrent negotiations
+
+Each negotiation is an ordinary bargaining State, advanced with the same agents
+and apply_*_action transitions as the single-episode graph (seller -> buyer ->
+round). An event scheduler interleaves the negotiations by the virtual time at
+which each is next ready to act; a turn takes `agent.latency` (default 1.0) on
+average, exponentially distributed so negotiations drift apart.
+
+Market rules on top of the single-episode graph:
+- a negotiation ends as soon as an agreement or breakdown happens, and the
+  listing is closed on agreement; other negotiations on it end as "sold"
+- a buyer whose negotiation fails goes back to the matching layer (outside
+  option) until it buys, runs out of listings, or hits max_attempts
+- a buyer whose listings are open but all busy (max_buyers_per_listing
+  negotiations each) waits in its categories' queues, and arrives again when
+  a slot frees up on a listing it has not tried
+- demand / supply in each State are rescaled from live activity: the scenario
+  values times (active buyers / initial buyers) and (open listings / initial
+  listings) in the product category, clipped to 0-10
+
+listings: list of {"listing_id", "seller_name", "seller": persona, "product": scenario}
+buyers:   list of {"buyer_id", "buyer_name", "buyer": persona, "categories": [...],
+                   "valuations": {listing_id: buyer_cost} (optional)}
+
+With LLM agents, set max_concurrency to the provider's concurrent-request
+limit: up to that many ready turns are sent to the agents at once.
+"""
+
+class Marketplace:
+    def __init__(self,
+                 listings,
+                 buyers,
+                 buyer_agent,
+                 seller_agent,
+                 max_rounds=10,
+                 max_buyers_per_listing=3,
+                 max_attempts=3,
+                 max_concurrency=1,
+                 seller_static=None,
+                 buyer_static=None,
+                 do_inference=False,
+                 arrival_spread=0.0,
+                 seed=None,
+                 keep_states=False):
+        # buyer_agent / seller_agent: one agent shared by everybody, or a dict
+        # keyed by buyer_name / seller_name
+        self.buyers = {}
+        for buyer in buyers:
+            if buyer["buyer_id"] in self.buyers:
+                raise ValueError(f"Duplicate buyer_id '{buyer['buyer_id']}'")
+            self.buyers[buyer["buyer_id"]] = buyer
+        self.matcher = Matcher(listings, max_buyers_per_listing)
+        self.buyer_agent = buyer_agent
+        self.seller_agent = seller_agent
+        self.max_rounds = max_rounds
+        self.max_attempts = max_attempts
+        self.max_concurrency = max_concurrency
+        self.seller_static = seller_static
+        self.buyer_static = buyer_static
+        self.do_inference = do_inference
+        self.arrival_spread = arrival_spread
+        self.rng = np.random.default_rng(seed)
+        self.keep_states = keep_states
+
+        # live market counts per category
+        self.base_demand = defaultdict(int)
+        self.base_supply = defaultdict(int)
+        for buyer in self.buyers.values():
+            for category in buyer["categories"]:
+                self.base_demand[category] += 1
+        for listing in listings:
+            self.base_supply[listing["product"]["category"]] += 1
+        self.demand_count = dict(self.base_demand)
+        self.supply_count = dict(self.base_supply)
+
+        self.scheduler = EventScheduler()
+        self.negotiations = {}
+        self.next_id = 0
+        self.tried = defaultdict(set)
+        self.attempts = defaultdict(int)
+        self.records = []
+        self.buyer_outcomes = {}
+        self.waiting = set()
+        self.wait_queues = defaultdict(deque)   # category -> waiting buyer ids (stale ones skipped)
+
+        # arrivals are scheduled once: run(until=t) followed by run() resumes the same market
+        for buyer_id in self.buyers:
+            arrival = self.rng.uniform(0, self.arrival_spread) if self.arrival_spread > 0 else 0.0
+            self.scheduler.push(arrival, ("arrive", buyer_id))
+
+    # -------------------------
+    # Market conditions
+    # -------------------------
+    def market_conditions(self, category, product):
+        demand = product["demand"] * self.demand_count.get(category, 0) / max(self.base_demand[category], 1)
+        supply = product["supply"] * self.supply_count.get(category, 0) / max(self.base_supply[category], 1)
+        return int(min(max(round(demand), 0), 10)), int(min(max(round(supply), 0), 10))
+
+    def buyer_leaves(self, buyer_id, outcome):
+        self.buyer_outcomes[buyer_id] = outcome
+        for category in self.buyers[buyer_id]["categories"]:
+            self.demand_count[category] -= 1
+
+    # -------------------------
+    # Matching
+    # -------------------------
+    def arrive(self, buyer_id, time):
+        buyer = self.buyers[buyer_id]
+        listing_id = self.matcher.match(buyer["categories"], self.tried[buyer_id])
+        if listing_id is None:
+            if self.matcher.has_open(buyer["categories"], self.tried[buyer_id]):
+                self.wait(buyer_id)
+            else:
+                self.buyer_leaves(buyer_id, "no_listing")
+            return
+        self.tried[buyer_id].add(listing_id)
+        self.attempts[buyer_id] += 1
+
+        listing = self.matcher.listings[listing_id]
+        product = dict(listing["product"])
+        product["buyer_cost"] = buyer.get("valuations", {}).get(listing_id, product["buyer_cost"])
+        state = build_state(product,
+                            buyer["buyer"],
+                            listing["seller"],
+                            buyer["buyer_name"],
+                            listing["seller_name"],
+                            self.max_rounds,
+                            self.seller_static,
+                            self.buyer_static,
+                            self.do_inference)
+
+        negotiation_id = self.next_id
+        self.next_id += 1
+        self.negotiations[negotiation_id] = {
+            "negotiation_id": negotiation_id,
+            "buyer_id": buyer_id,
+            "listing_id": listing_id,
+            "state": state,
+            "start_time": time,
+        }
+        self.scheduler.push(time, ("seller", negotiation_id))
+
+    def wait(self, buyer_id):
+        # all listings left for the buyer are busy: queue it until a slot frees up
+        self.waiting.add(buyer_id)
+        for category in self.buyers[buyer_id]["categories"]:
+            self.wait_queues[category].append(buyer_id)
+
+    def wake(self, listing_id, time):
+        # a slot freed up on listing_id: the first waiting buyer who has not tried it arrives again
+        queue = self.wait_queues[self.matcher.category(listing_id)]
+        skipped = []
+        while queue:
+            buyer_id = queue.popleft()
+            if buyer_id not in self.waiting:
+                continue   # already woken through another category
+            if listing_id in self.tried[buyer_id]:
+                skipped.append(buyer_id)
+                continue
+            self.waiting.discard(buyer_id)
+            self.scheduler.push(time, ("arrive", buyer_id))
+            break
+        queue.extendleft(reversed(skipped))
+
+    def drop_stranded(self, category):
+        # a listing was sold: waiting buyers with no open listing left leave
+        for buyer_id in self.wait_queues[category]:
+            if buyer_id in self.waiting \
+                    and not self.matcher.has_open(self.buyers[buyer_id]["categories"], self.tried[buyer_id]):
+                self.waiting.discard(buyer_id)
+                self.buyer_leaves(buyer_id, "no_listing")
+        self.wait_queues[category] = deque(b for b in self.wait_queues[category] if b in self.waiting)
+
+    def finish(self, negotiation_id, time, reason):
+        negotiation = self.negotiations.pop(negotiation_id)
+        state = negotiation["state"]
+        listing_id = negotiation["listing_id"]
+        buyer_id = negotiation["buyer_id"]
+        self.matcher.release(listing_id)
+
+        if reason == "agreement":
+            self.matcher.close(listing_id)
+            self.supply_count[self.matcher.category(listing_id)] -= 1
+            self.buyer_leaves(buyer_id, "bought")
+            self.drop_stranded(self.matcher.category(listing_id))
+        else:
+            if self.matcher.is_open[listing_id]:
+                # the freed slot goes to a waiting buyer
+                self.wake(listing_id, time)
+            if self.attempts[buyer_id] < self.max_attempts:
+                # outside option: try another listing
+                self.scheduler.push(time, ("arrive", buyer_id))
+            else:
+                self.buyer_leaves(buyer_id, "gave_up")
+
+        record = {
+            "negotiation_id": negotiation_id,
+            "buyer_id": buyer_id,
+            "listing_id": listing_id,
+            "reason": reason,
+            "agreed_price": state["agreed_price"] if reason == "agreement" else None,
+            "rounds": state["round"],
+            "start_time": negotiation["start_time"],
+            "end_time": time,
+        }
+        if reason in ("agreement", "breakdown", "max_rounds"):
+            seller_agent = self.agent_for(self.seller_agent, self.matcher.listings[listing_id]["seller_name"])
+            record["metrics"] = evaluate_conversation(state, getattr(seller_agent, "seller_params", None))
+        if self.keep_states:
+            record["state"] = state
+        self.records.append(record)
+
+    # -------------------------
+    # Negotiation steps
+    # -------------------------
+    def agent_for(self, agents, name):
+        if isinstance(agents, dict):
+            return agents[name]
+        return agents
+
+    def prepare(self, negotiation_id, node, time):
+        # returns the agent call to make, or None if the negotiation is over
+        negotiation = self.negotiations[negotiation_id]
+        listing_id = negotiation["listing_id"]
+        if not self.matcher.is_open[listing_id]:
+            self.finish(negotiation_id, time, "sold")
+            return None
+
+        state = negotiation["state"]
+        listing = self.matcher.listings[listing_id]
+        state["demand"], state["supply"] = self.market_conditions(listing["product"]["category"],
+                                                                  listing["product"])
+        # agents are keyed by the listing / buyer names (the State may hold display names)
+        if node == "seller":
+            agent = self.agent_for(self.seller_agent, listing["seller_name"])
+        else:
+            agent = self.agent_for(self.buyer_agent, self.buyers[negotiation["buyer_id"]]["buyer_name"])
+        return agent, state
+
+    def apply(self, negotiation_id, node, time, agent, result):
+        negotiation = self.negotiations.get(negotiation_id)
+        if negotiation is None:
+            return
+        if not self.matcher.is_open[negotiation["listing_id"]]:
+            # sold to someone else while this turn was in flight
+            self.finish(negotiation_id, time, "sold")
+            return
+
+        state = negotiation["state"]
+        if node == "seller":
+            action, seller_choices = result
+            state = apply_seller_action(state, action, seller_choices)
+        else:
+            action, inference, buyer_choices = result
+            state = apply_buyer_action(state, action, inference, buyer_choices)
+        negotiation["state"] = state
+
+        if state["agreement_reached"]:
+            self.finish(negotiation_id, time, "agreement")
+            return
+        if state["breakdown"]:
+            self.finish(negotiation_id, time, "breakdown")
+            return
+
+        next_time = time + self.rng.exponential(getattr(agent, "latency", 1.0))
+        if node == "seller":
+            self.scheduler.push(next_time, ("buyer", negotiation_id))
+            return
+
+        state = increment_round(state)
+        negotiation["state"] = state
+        if should_continue(state) == "end":
+            self.finish(negotiation_id, time, termination_reason(state))
+        else:
+            self.scheduler.push(next_time, ("seller", negotiation_id))
+
+    # -------------------------
+    # Main loop
+    # -------------------------
+    def run(self, until=None):
+        # runs events up to time until (all if None); can be called again to continue
+        executor = None
+        if self.max_concurrency > 1:
+            executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            while len(self.scheduler):
+                if until is not None and self.scheduler.heap[0][0] > until:
+                    break
+                batch = self.scheduler.pop_batch(self.max_concurrency)
+
+                calls = []
+                for time, (node, key) in batch:
+                    if node == "arrive":
+                        self.arrive(key, time)
+                        continue
+                    prepared = self.prepare(key, node, time)
+                    if prepared is not None:
+                        calls.append((time, node, key) + prepared)
+
+                if executor is None:
+                    results = [agent.act(state) for _, _, _, agent, state in calls]
+                else:
+                    results = list(executor.map(lambda call: call[3].act(call[4]), calls))
+
+                # apply in ready-time order, so a listing goes to the first accept
+                for (time, node, key, agent, _), result in zip(calls, results):
+                    self.apply(key, node, time, agent, result)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return self.records
+
+    def summary(self):
+        reasons = defaultdict(int)
+        prices = []
+        for record in self.records:
+            reasons[record["reason"]] += 1
+            if record["agreed_price"] is not None:
+                prices.append(record["agreed_price"])
+        outcomes = defaultdict(int)
+        for outcome in self.buyer_outcomes.values():
+            outcomes[outcome] += 1
+        return {
+            "negotiations": len(self.records),
+            "reasons": dict(reasons),
+            "buyer_outcomes": dict(outcomes),
+            "mean_price": float(np.mean(prices)) if prices else None,
+            "end_time": self.scheduler.now,
+        }
@@ -0,0 +1,70 @@
+from collections import defaultdict, deque
+"""
+Matching layer for the marketplace: pairs waiting buyers with open listings
+
+Listings are grouped by product category. Each category keeps a round-robin
+queue of listings that are open and still have a free negotiation slot, so a
+seller's listing is spread over several buyers (up to max_buyers_per_listing)
+and a buyer never gets a listing it already negotiated for. When match finds
+nothing, has_open tells whether listings are left that are only busy (the
+buyer can wait for a slot) or none are (the buyer is out of listings).
+"""
+
+class Matcher:
+    def __init__(self, listings, max_buyers_per_listing=3):
+        self.capacity = max_buyers_per_listing
+        self.listings = {}
+        self.is_open = {}
+        self.active = {}
+        self.queues = defaultdict(deque)   # category -> listing ids with a free slot
+        self.open_count = defaultdict(int) # category -> open listings
+        for listing in listings:
+            listing_id = listing["listing_id"]
+            if listing_id in self.listings:
+                raise ValueError(f"Duplicate listing_id '{listing_id}'")
+            self.listings[listing_id] = listing
+            self.is_open[listing_id] = True
+            self.active[listing_id] = 0
+            self.queues[listing["product"]["category"]].append(listing_id)
+            self.open_count[listing["product"]["category"]] += 1
+
+    def category(self, listing_id):
+        return self.listings[listing_id]["product"]["category"]
+
+    def match(self, categories, tried=()):
+        # returns a listing id for a buyer interested in these categories, or None
+        for category in categories:
+            queue = self.queues[category]
+            for _ in range(len(queue)):
+                listing_id = queue.popleft()
+                if not self.is_open[listing_id] or self.active[listing_id] >= self.capacity:
+                    continue   # dropped; release() re-queues it if a slot frees up
+                if listing_id in tried:
+                    queue.append(listing_id)
+                    continue
+                self.active[listing_id] += 1
+                if self.active[listing_id] < self.capacity:
+                    queue.append(listing_id)
+                return listing_id
+        return None
+
+    def has_open(self, categories, tried=()):
+        # whether an open listing the buyer has not tried is left, free slot or not
+        for category in categories:
+            tried_open = sum(1 for listing_id in tried
+                             if self.is_open[listing_id] and self.category(listing_id) == category)
+            if self.open_count[category] > tried_open:
+                return True
+        return False
+
+    def release(self, listing_id):
+        # a negotiation on this listing ended
+        self.active[listing_id] -= 1
+        if self.is_open[listing_id] and self.active[listing_id] == self.capacity - 1:
+            self.queues[self.category(listing_id)].append(listing_id)
+
+    def close(self, listing_id):
+        # listing sold, no further matches
+        if self.is_open[listing_id]:
+            self.open_count[self.category(listing_id)] -= 1
+        self.is_open[listing_id] = False
@@ -0,0 +1,33 @@
+import heapq
+"""
+Event-driven scheduler for the marketplace
+Negotiations are kept in a heap keyed by the (virtual) time at which they are
+next ready to act. Ties are broken by insertion order, so runs are reproducible.
+"""
+
+class EventScheduler:
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+        self.now = 0.0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, time, item):
+        heapq.heappush(self.heap, (time, self.seq, item))
+        self.seq += 1
+
+    def pop(self):
+        time, _, item = heapq.heappop(self.heap)
+        self.now = max(self.now, time)
+        return time, item
+
+    def pop_batch(self, max_size):
+        # pop up to max_size events in ready-time order
+        # (at most one event per negotiation is ever in the heap, so a batch
+        # never holds two steps of the same negotiation)
+        batch = []
+        while self.heap and len(batch) < max_size:
+            batch.append(self.pop())
+        return batch
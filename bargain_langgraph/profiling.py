@@ -0,0 +1,260 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+"""
+Optional CPU / memory profiling of graph nodes and agent phases
+
+Phases are nested named regions: the nodes (seller, buyer, round), inside a
+node the agent's act and the state transition, and inside act the agent
+phases (render, call, parse, dynamics). sweep.py / runner.py also wrap each
+episode, so episode self time is orchestration (LangGraph) overhead.
+
+    profiler = start_profiling(cpu="cprofile", memory=True)
+    ... run episodes ...
+    stop_profiling().write("profile")
+
+For every phase path (e.g. seller/act/call), aggregated over all episodes:
+calls, wall / self / CPU time, peak and retained traced memory (tracemalloc,
+memory=True). write() saves
+- phases.txt / phases.json: the table
+- phases.folded: phase self times (microseconds) as folded stacks
+- profile.pstats (cpu="cprofile"): function-level profile of the profiling thread
+- stacks.folded (cpu="sampling"): sampled Python stacks of every thread inside
+  a phase, prefixed by its phase path
+
+Folded files load in flamegraph.pl, speedscope or inferno. cProfile only sees
+the thread that started it, so use cpu="sampling" with max_workers > 1; traced
+memory is process-wide, so memory figures are only per-phase with one worker.
+
+When no profiler is running, phase() returns a shared no-op context and the
+engines build their nodes unwrapped, so the cost is negligible. Nodes wrapped
+while profiling still run (unprofiled) after stop_profiling(); the native
+engine checks for a profiler on every invoke.
+"""
+
+_NULL_PHASE = nullcontext()
+_profiler = None
+
+
+def active():
+    return _profiler is not None
+
+
+def phase(name):
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_PHASE
+    return profiler.phase(name)
+
+
+def profiled(name, fn):
+    # fn wrapped in phase(name) if profiling is on when wrapping; the wrapper
+    # records into the profiler running at call time, and calls fn if none is
+    if _profiler is None:
+        return fn
+
+    def wrapper(*args, **kwargs):
+        profiler = _profiler
+        if profiler is None:
+            return fn(*args, **kwargs)
+        with profiler.phase(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def start_profiling(cpu="cprofile", memory=False, interval=0.001):
+    # cpu: "cprofile", "sampling" or None (phase timings only)
+    global _profiler
+    if _profiler is not None:
+        raise RuntimeError("A profiler is already running")
+    if cpu not in ("cprofile", "sampling", None):
+        raise ValueError(f"Unknown cpu profiler '{cpu}' (expected 'cprofile', 'sampling' or None)")
+    _profiler = Profiler(cpu, memory, interval)
+    _profiler.start()
+    return _profiler
+
+
+def stop_profiling():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        raise RuntimeError("No profiler is running")
+    profiler.stop()
+    return profiler
+
+
+class Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+
+    def __exit__(self, *exc):
+        self.profiler.exit()
+
+
+class Profiler:
+    def __init__(self, cpu="cprofile", memory=False, interval=0.001):
+        self.cpu = cpu
+        self.memory = memory
+        self.interval = interval
+        self.stats = {}          # path -> [calls, wall, cpu, child wall, peak, retained]
+        self.stacks = {}         # thread id -> list of open frames
+        self.samples = {}        # folded stack -> count
+        self.lock = threading.Lock()
+        self.cprofile = None
+        self.sampler = None
+        self.stop_event = threading.Event()
+
+    # -------------------------
+    # Phases
+    # -------------------------
+    def phase(self, name):
+        return Phase(self, name)
+
+    def enter(self, name):
+        stack = self.stacks.setdefault(threading.get_ident(), [])
+        path = stack[-1]["path"] + (name,) if stack else (name,)
+        frame = {"path": path, "child": 0.0}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            frame["mem"] = current
+            frame["peak"] = current
+            tracemalloc.reset_peak()
+        frame["cpu"] = time.thread_time()
+        frame["wall"] = time.perf_counter()
+        stack.append(frame)
+
+    def exit(self):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        stack = self.stacks[threading.get_ident()]
+        frame = stack.pop()
+        wall -= frame["wall"]
+        peak = retained = 0
+        if self.memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            frame["peak"] = max(frame["peak"], traced_peak)
+            peak = frame["peak"] - frame["mem"]
+            retained = current - frame["mem"]
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], frame["peak"])
+            tracemalloc.reset_peak()
+        if stack:
+            stack[-1]["child"] += wall
+
+        with self.lock:
+            s = self.stats.setdefault(frame["path"], [0, 0.0, 0.0, 0.0, 0, 0])
+            s[0] += 1
+            s[1] += wall
+            s[2] += cpu - frame["cpu"]
+            s[3] += frame["child"]
+            s[4] = max(s[4], peak)
+            s[5] += retained
+
+    # -------------------------
+    # Start / stop
+    # -------------------------
+    def start(self):
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu == "cprofile":
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        elif self.cpu == "sampling":
+            self.sampler = threading.Thread(target=self.sample_loop, daemon=True)
+            self.sampler.start()
+
+    def stop(self):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.sampler is not None:
+            self.stop_event.set()
+            self.sampler.join()
+        if self.memory:
+            tracemalloc.stop()
+
+    def sample_loop(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                try:
+                    path = self.stacks[tid][-1]["path"]
+                except (KeyError, IndexError):
+                    # not inside a phase (or left it meanwhile)
+                    continue
+                if tid == own:
+                    continue
+                functions = []
+                while frame is not None:
+                    code = frame.f_code
+                    functions.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join([f"[{p}]" for p in path] + functions[::-1])
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    # -------------------------
+    # Results
+    # -------------------------
+    def table(self) -> list[dict]:
+        with self.lock:
+            stats = dict(self.stats)
+        rows = []
+        for path, (calls, wall, cpu, child, peak, retained) in sorted(stats.items()):
+            rows.append({
+                "phase": "/".join(path),
+                "calls": calls,
+                "wall_s": wall,
+                "self_s": wall - child,
+                "cpu_s": cpu,
+                "mean_ms": 1000 * wall / calls,
+                "peak_kib": peak / 1024,
+                "retained_kib": retained / 1024,
+            })
+        return rows
+
+    def format_table(self) -> str:
+        lines = [f"{'phase':<32}{'calls':>9}{'wall s':>10}{'self s':>10}{'cpu s':>10}{'mean ms':>10}"
+                 + (f"{'peak KiB':>11}{'kept KiB':>11}" if self.memory else "")]
+        for row in self.table():
+            line = (f"{row['phase']:<32}{row['calls']:>9}{row['wall_s']:>10.3f}{row['self_s']:>10.3f}"
+                    f"{row['cpu_s']:>10.3f}{row['mean_ms']:>10.3f}")
+            if self.memory:
+                line += f"{row['peak_kib']:>11.1f}{row['retained_kib']:>11.1f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def write(self, directory) -> list[str]:
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+
+        def path(name):
+            paths.append(os.path.join(directory, name))
+            return paths[-1]
+
+        rows = self.table()
+        with open(path("phases.txt"), "w") as f:
+            f.write(self.format_table() + "\n")
+        with open(path("phases.json"), "w") as f:
+            json.dump({"cpu": self.cpu, "memory": self.memory, "phases": rows}, f, indent=2)
+        with open(path("phases.folded"), "w") as f:
+            for row in rows:
+                micros = int(round(row["self_s"] * 1e6))
+                if micros > 0:
+                    f.write(f"{row['phase'].replace('/', ';')} {micros}\n")
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(path("profile.pstats"))
+        if self.sampler is not None:
+            with open(path("stacks.folded"), "w") as f:
+                for key, count in sorted(self.samples.items()):
+                    f.write(f"{key} {count}\n")
+        return paths
@@ -7,9 +7,12 @@ from langchain_openai import ChatOpenAI
 
 from bargain_langgraph.agents.buyer import BuyerAgent
 from bargain_langgraph.agents.seller import SellerAgent
+from bargain_langgraph.agents.cascade import ModelCascade
+from bargain_langgraph.agents.chat import usage_summary
 from bargain_langgraph.dynamics.state import get_initial_state
 from bargain_langgraph.graph.bargaining_graph import build_bargaining_graph
 from bargain_langgraph.evaluation.metrics import evaluate_conversation
+from bargain_langgraph.profiling import phase, start_profiling, stop_profiling
 
 """
 Main code to parse input arguments and run a single bargaining conversation
@@ -63,6 +66,28 @@ def main():
     parser.add_argument("--buyer_inference", required=False, default=False,
                         help="If buyer makes inference on seller private info (currently True defaults to full information setting")
 
+    parser.add_argument("--seller_profile", required=False, default=None,
+                        help="Fitted seller dynamics profile (json, see dynamics/estimation.py) for a dynamic seller")
+
+    parser.add_argument("--cheap_model", required=False, default=None,
+                        help="If provided, routine turns go to this model and decisive ones to --model (see agents/cascade.py)")
+    parser.add_argument("--cascade_log", required=False, default=None,
+                        help="File (jsonl) to append the cascade's routing decisions to")
+
+    parser.add_argument("--prompt_mode", required=False, default="single", choices=["single", "chat"],
+                        help="single: whole prompt re-rendered each turn; chat: stable system prefix + incremental turn messages")
+
+    parser.add_argument("--profile", required=False, default=None, nargs="?", const="cprofile",
+                        choices=["cprofile", "sampling", "phases"],
+                        help="Profile nodes and agent phases (cProfile, sampling profiler, or phase timings only)")
+    parser.add_argument("--profile_memory", action="store_true",
+                        help="With --profile, also trace peak / retained memory per phase (tracemalloc, slower)")
+    parser.add_argument("--profile_dir", required=False, default="profile",
+                        help="Directory for the profile tables, pstats and folded stacks")
+
+    parser.add_argument("--engine", required=False, default="langgraph", choices=["langgraph", "native"],
+                        help="Run with the LangGraph executor or the native turn loop (same results)")
+
     parser.add_argument("--save_to", required=False, default=None, help="Directory to save conversations")
 
     args = parser.parse_args()
@@ -125,29 +150,63 @@ def main():
         openai_api_base="https://openrouter.ai/api/v1",
     )
 
+    if args.cheap_model is not None:
+        cheap_llm = ChatOpenAI(
+            model=f"openai/{args.cheap_model}",
+            temperature=args.temp,
+            openai_api_key=api_key,
+            openai_api_base="https://openrouter.ai/api/v1",
+        )
+        llm = ModelCascade(cheap_llm=cheap_llm, strong_llm=llm, log_path=args.cascade_log)
+
     # ------------------------------------------------------------
     # 4. Load prompts
     # ------------------------------------------------------------
-    buyer_prompt = load_prompt("bargain_langgraph/prompts/buyer.txt")
-    seller_prompt = load_prompt("bargain_langgraph/prompts/seller.txt")
+    usage_log = []
+    if args.prompt_mode == "chat":
+        buyer_agent = BuyerAgent(llm=llm,
+                                 prompt_template=load_prompt("bargain_langgraph/prompts/buyer_system.txt"),
+                                 turn_template=load_prompt("bargain_langgraph/prompts/buyer_turn.txt"),
+                                 usage_log=usage_log)
+        seller_agent = SellerAgent(llm=llm,
+                                   prompt_template=load_prompt("bargain_langgraph/prompts/seller_system.txt"),
+                                   seller_profile=args.seller_profile,
+                                   turn_template=load_prompt("bargain_langgraph/prompts/seller_turn.txt"),
+                                   usage_log=usage_log)
+    else:
+        buyer_prompt = load_prompt("bargain_langgraph/prompts/buyer.txt")
+        seller_prompt = load_prompt("bargain_langgraph/prompts/seller.txt")
 
-    buyer_agent = BuyerAgent(llm=llm, prompt_template=buyer_prompt)
-    seller_agent = SellerAgent(llm=llm, prompt_template=seller_prompt)
+        buyer_agent = BuyerAgent(llm=llm, prompt_template=buyer_prompt, usage_log=usage_log)
+        seller_agent = SellerAgent(llm=llm, prompt_template=seller_prompt, seller_profile=args.seller_profile,
+                                   usage_log=usage_log)
 
     # ------------------------------------------------------------
     # 5. Build and run graph
     # ------------------------------------------------------------
+    if args.profile is not None:
+        # before building the graph: nodes are wrapped at build time
+        start_profiling(cpu=None if args.profile == "phases" else args.profile,
+                        memory=args.profile_memory)
+
     graph = build_bargaining_graph(
         buyer_agent=buyer_agent,
         seller_agent=seller_agent,
+        engine=args.engine,
     )
 
-    final_state = graph.invoke(initial_state)
+    with phase("episode"):
+        final_state = graph.invoke(initial_state)
+
+    if args.profile is not None:
+        profiler = stop_profiling()
+        print(profiler.format_table())
+        print(f"Profile written to {', '.join(profiler.write(args.profile_dir))}")
 
     # ------------------------------------------------------------
     # 6. Evaluation
     # ------------------------------------------------------------
-    metrics = evaluate_conversation(final_state)
+    metrics = evaluate_conversation(final_state, seller_agent.seller_params)
 
     # ------------------------------------------------------------
     # 7. Output
@@ -167,6 +226,22 @@ def main():
     print(f"Buyer saving percentage: {metrics['buyer_savings_pct']*100:.3f}%")
     print(f"Assuming discounts are static, Rubinstein equilibrium price: ${metrics['equilibrium_price']:.3f}")
     print(f"Percentage settled above equilibrium: {metrics['above_eq_pct']*100:.3f}% (higher is worse)")
+    print(f"Finite-horizon equilibrium price ({final_state['max_rounds']} rounds, "
+          f"{final_state['seller_discount_type']} seller discount): ${metrics['horizon_equilibrium_price']:.3f}")
+    print(f"Percentage settled above finite-horizon equilibrium: {metrics['above_horizon_eq_pct']*100:.3f}% (higher is worse)")
+
+    if args.cheap_model is not None:
+        routing = llm.summary()
+        print(f"\nCascade ({args.cheap_model} -> {args.model}): {routing['turns']} LLM turns, "
+              f"strong share {routing['strong_share']:.3f}, escalations {routing['reasons']}")
+
+    print(f"\nPrompt tokens per LLM call ({args.prompt_mode} prompt mode):")
+    for u in usage_log:
+        print(f"round {u['round']} {u['role']}: {u['input_tokens']} prompt tokens, "
+              f"{u['cached_tokens']} cached, {u['uncached_tokens']} uncached")
+    usage = usage_summary(usage_log)
+    if usage["cache_hit_rate"] is not None:
+        print(f"Total: {usage['input_tokens']} prompt tokens, {usage['cache_hit_rate']*100:.1f}% cached")
 
     print("\nConversation history:")
     for step in final_state["history"]:
@@ -202,6 +277,8 @@ def main():
             "metrics": metrics,
             "history": final_state["history"],
             "initial_state": initial_state,
+            "prompt_mode": args.prompt_mode,
+            "usage": usage_log,
         }
 
         with open(filepath, "w") as f:
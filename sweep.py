@@ -0,0 +1,294 @@
+import os
+import json
+import argparse
+from dotenv import load_dotenv
+import datetime
+
+from bargain_langgraph.agents.buyer import BuyerAgent
+from bargain_langgraph.agents.seller import SellerAgent
+from bargain_langgraph.agents.rule import RuleBuyerAgent, RuleSellerAgent
+from bargain_langgraph.agents.cascade import ModelCascade
+from bargain_langgraph.experiments.cascade_report import compare_cascade, format_report
+from bargain_langgraph.experiments.sweep import make_grid, run_sweep, run_adaptive_sweep
+from bargain_langgraph.evaluation.streaming import StreamingAggregator
+from bargain_langgraph.agents.chat import usage_summary
+from bargain_langgraph.profiling import start_profiling, stop_profiling
+
+"""
+Run a sweep of bargaining episodes over a grid of scenarios / personas / emotions
+Fixed mode runs --repeats episodes per cell; --adaptive runs waves of episodes
+until each cell's confidence interval on --metric is narrower than --target
+"""
+
+# ------------------------------------------------------------
+# Utility loaders
+# ------------------------------------------------------------
+
+def load_prompt(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def split(value):
+    return [v.strip() for v in value.split(",")]
+
+
+def build_llm(model, temp):
+    from langchain_openai import ChatOpenAI
+
+    load_dotenv()
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if api_key is None:
+        raise RuntimeError("OPENROUTER_API_KEY not set")
+
+    return ChatOpenAI(
+        model=f"openai/{model}",
+        temperature=float(temp),
+        openai_api_key=api_key,
+        openai_api_base="https://openrouter.ai/api/v1",
+    )
+
+
+def build_agents(args, usage_log=None):
+    if args.agents == "rule":
+        return RuleBuyerAgent(noise=0.05), RuleSellerAgent(noise=0.05)
+
+    llm = build_llm(args.model, args.temp)
+    if args.cheap_model is not None:
+        llm = ModelCascade(cheap_llm=build_llm(args.cheap_model, args.temp), strong_llm=llm,
+                           log_path=args.cascade_log)
+    if args.prompt_mode == "chat":
+        buyer_agent = BuyerAgent(llm=llm,
+                                 prompt_template=load_prompt("bargain_langgraph/prompts/buyer_system.txt"),
+                                 turn_template=load_prompt("bargain_langgraph/prompts/buyer_turn.txt"),
+                                 usage_log=usage_log)
+        seller_agent = SellerAgent(llm=llm,
+                                   prompt_template=load_prompt("bargain_langgraph/prompts/seller_system.txt"),
+                                   turn_template=load_prompt("bargain_langgraph/prompts/seller_turn.txt"),
+                                   usage_log=usage_log)
+        return buyer_agent, seller_agent
+    buyer_agent = BuyerAgent(llm=llm, prompt_template=load_prompt("bargain_langgraph/prompts/buyer.txt"),
+                             usage_log=usage_log)
+    seller_agent = SellerAgent(llm=llm, prompt_template=load_prompt("bargain_langgraph/prompts/seller.txt"),
+                               usage_log=usage_log)
+    return buyer_agent, seller_agent
+
+
+def write_profile(args):
+    profiler = stop_profiling()
+    print("\n=== Profile (all episodes) ===")
+    print(profiler.format_table())
+    print(f"Profile written to {', '.join(profiler.write(args.profile_dir))}")
+
+
+# ------------------------------------------------------------
+# Main
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Run a sweep of LLM bargaining simulations")
+    parser.add_argument("--model", required=False, default='gpt-4.1-mini',
+                        help="OpenRouter model name (e.g. gpt-4.1-mini)")
+    parser.add_argument("--temp", required=False, default=0.1, help="LLM temperature")
+    parser.add_argument("--agents", required=False, default="llm", choices=["llm", "rule"],
+                        help="LLM agents or rule-based (LLM-free) agents")
+
+    parser.add_argument("--product_names", required=True, help="Comma separated product names")
+    parser.add_argument("--buyer_names", required=True, help="Comma separated buyer profile names")
+    parser.add_argument("--seller_names", required=True, help="Comma separated seller profile names")
+    parser.add_argument("--buyer_emotions", required=False, default=None,
+                        help="Comma separated buyer emotions (default: persona emotion)")
+    parser.add_argument("--seller_emotions", required=False, default=None,
+                        help="Comma separated seller emotions (default: persona emotion)")
+    parser.add_argument("--seller_types", required=False, default="static",
+                        help="Comma separated seller emotion/discount types (static, dynamic)")
+    parser.add_argument("--max_rounds", required=False, default=10, type=int,
+                        help="Maximum number of turns for conversation")
+
+    parser.add_argument("--repeats", required=False, default=5, type=int,
+                        help="Episodes per cell (fixed mode)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Allocate episodes adaptively until confidence targets are met")
+    parser.add_argument("--metric", required=False, default="above_eq_pct",
+                        help="Metric the adaptive target applies to (e.g. above_eq_pct, success)")
+    parser.add_argument("--target", required=False, default=0.02, type=float,
+                        help="Target confidence interval half-width per cell")
+    parser.add_argument("--budget", required=False, default=500, type=int,
+                        help="Maximum total number of episodes (adaptive mode)")
+    parser.add_argument("--wave_size", required=False, default=50, type=int,
+                        help="Episodes per wave (adaptive mode)")
+    parser.add_argument("--min_episodes", required=False, default=5, type=int,
+                        help="Pilot episodes per cell (adaptive mode)")
+    parser.add_argument("--max_workers", required=False, default=1, type=int,
+                        help="Episodes run concurrently")
+    parser.add_argument("--cheap_model", required=False, default=None,
+                        help="If provided, routine turns go to this model and decisive ones to --model (see agents/cascade.py)")
+    parser.add_argument("--cascade_log", required=False, default=None,
+                        help="File (jsonl) to append the cascade's routing decisions to")
+    parser.add_argument("--cascade_report", action="store_true",
+                        help="Run the grid with the cascade and with --model only, and compare (needs --cheap_model)")
+    parser.add_argument("--prompt_mode", required=False, default="single", choices=["single", "chat"],
+                        help="single: whole prompt re-rendered each turn; chat: stable system prefix + incremental turn messages")
+    parser.add_argument("--profile", required=False, default=None, nargs="?", const="cprofile",
+                        choices=["cprofile", "sampling", "phases"],
+                        help="Profile nodes and agent phases (cProfile, sampling profiler, or phase timings only)")
+    parser.add_argument("--profile_memory", action="store_true",
+                        help="With --profile, also trace peak / retained memory per phase (tracemalloc, slower)")
+    parser.add_argument("--profile_dir", required=False, default="profile",
+                        help="Directory for the profile tables, pstats and folded stacks")
+    parser.add_argument("--engine", required=False, default="langgraph", choices=["langgraph", "native"],
+                        help="Run episodes with the LangGraph executor or the native turn loop")
+
+    parser.add_argument("--checkpoint", required=False, default=None,
+                        help="JSON file for running aggregate metrics, rewritten during the sweep")
+    parser.add_argument("--checkpoint_every", required=False, default=20, type=int,
+                        help="Episodes between checkpoints")
+
+    parser.add_argument("--save_to", required=False, default=None, help="Directory to save sweep results")
+
+    args = parser.parse_args()
+
+    axes = {
+        "product_name": split(args.product_names),
+        "buyer_name": split(args.buyer_names),
+        "seller_name": split(args.seller_names),
+        "max_rounds": [args.max_rounds],
+    }
+    if args.buyer_emotions is not None:
+        axes["buyer_emotion"] = split(args.buyer_emotions)
+    if args.seller_emotions is not None:
+        axes["seller_emotion"] = split(args.seller_emotions)
+    seller_types = split(args.seller_types)
+    axes["seller_emotion_type"] = seller_types
+    axes["seller_discount_type"] = seller_types
+    cells = make_grid(**axes)
+    # keep emotion and discount type equal for the seller
+    cells = [c for c in cells if c["seller_emotion_type"] == c["seller_discount_type"]]
+
+    if args.profile is not None:
+        # before any graph is built: nodes are wrapped at build time
+        start_profiling(cpu=None if args.profile == "phases" else args.profile,
+                        memory=args.profile_memory)
+
+    if args.cascade_report:
+        if args.cheap_model is None:
+            raise ValueError("--cascade_report needs --cheap_model")
+        if args.prompt_mode == "chat":
+            prompts = {"buyer_prompt": load_prompt("bargain_langgraph/prompts/buyer_system.txt"),
+                       "seller_prompt": load_prompt("bargain_langgraph/prompts/seller_system.txt"),
+                       "buyer_turn": load_prompt("bargain_langgraph/prompts/buyer_turn.txt"),
+                       "seller_turn": load_prompt("bargain_langgraph/prompts/seller_turn.txt")}
+        else:
+            prompts = {"buyer_prompt": load_prompt("bargain_langgraph/prompts/buyer.txt"),
+                       "seller_prompt": load_prompt("bargain_langgraph/prompts/seller.txt")}
+        report = compare_cascade(cells,
+                                 build_llm(args.cheap_model, args.temp),
+                                 build_llm(args.model, args.temp),
+                                 repeats=args.repeats,
+                                 max_workers=args.max_workers,
+                                 engine=args.engine,
+                                 **prompts)
+        print(format_report(report))
+        if args.profile is not None:
+            write_profile(args)
+        if args.save_to is not None:
+            os.makedirs(args.save_to, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = os.path.join(args.save_to, f"cascade_report_{timestamp}.json")
+            with open(filepath, "w") as f:
+                json.dump({"args": vars(args), "report": report}, f, indent=2)
+            print(f"\nReport saved to {filepath}")
+        return
+
+    usage_log = []
+    buyer_agent, seller_agent = build_agents(args, usage_log)
+    aggregator = StreamingAggregator(checkpoint_path=args.checkpoint,
+                                     checkpoint_every=args.checkpoint_every)
+
+    episodes = []
+
+    def on_episode(result):
+        if result["final_state"] is None:
+            episodes.append({"cell": result["cell"], "error": result["error"]})
+            print(f"Episode failed: {result['error']}")
+            return
+        episodes.append({
+            "cell": result["cell"],
+            "final_agreed_price": result["final_state"]["agreed_price"],
+            "rounds_taken": result["final_state"]["round"],
+            "metrics": result["metrics"],
+            "history": result["final_state"]["history"],
+        })
+
+    # whatever stops the sweep, the episodes finished so far are saved
+    summary = None
+    try:
+        if args.adaptive:
+            summary = run_adaptive_sweep(cells, buyer_agent, seller_agent,
+                                         metric=args.metric,
+                                         target=args.target,
+                                         budget=args.budget,
+                                         wave_size=args.wave_size,
+                                         min_episodes=args.min_episodes,
+                                         max_workers=args.max_workers,
+                                         on_episode=on_episode,
+                                         aggregator=aggregator,
+                                         engine=args.engine)
+            print("\n=== Adaptive sweep finished ===")
+            print(f"Episodes used: {summary['episodes_used']} in {summary['waves']} waves")
+            print(f"All cells met target half-width {args.target} on {args.metric}: {summary['all_met']}")
+            for key, s in summary["cells"].items():
+                print(f"{key}: n={s['episodes']} estimate={s['estimate']} +/- {s['half_width']:.4f}")
+            for key, s in summary["undefined_cells"].items():
+                print(f"{key}: n={s['episodes']} {args.metric} undefined in {s['missing']} episodes, gave up")
+        else:
+            by_cell = run_sweep(cells, buyer_agent, seller_agent,
+                                repeats=args.repeats,
+                                max_workers=args.max_workers,
+                                on_episode=on_episode,
+                                aggregator=aggregator,
+                                engine=args.engine)
+            summary = {"repeats": args.repeats, "cells": by_cell}
+            print("\n=== Sweep finished ===")
+            for key, metrics in by_cell.items():
+                successes = sum(m["success"] for m in metrics)
+                print(f"{key}: {successes}/{len(metrics)} agreements")
+        failures = sum("error" in e for e in episodes)
+        if failures:
+            print(f"{failures} episodes failed (see 'error' in the saved episodes)")
+
+        if isinstance(getattr(buyer_agent, "llm", None), ModelCascade):
+            routing = buyer_agent.llm.summary()
+            print(f"\nCascade: {routing['turns']} LLM turns, strong share {routing['strong_share']}, "
+                  f"escalations {routing['reasons']}")
+
+        usage = usage_summary(usage_log)
+        if usage["cache_hit_rate"] is not None:
+            print(f"\nPrompt tokens ({args.prompt_mode} prompt mode): {usage['input_tokens']} over "
+                  f"{usage['turns']} LLM calls, {usage['cache_hit_rate']*100:.1f}% cached")
+            summary["usage"] = usage
+
+    finally:
+        if args.profile is not None:
+            write_profile(args)
+
+        if args.checkpoint is not None:
+            aggregator.checkpoint()
+            print(f"\nAggregate metrics checkpointed to {args.checkpoint}")
+
+        # ----------------------------------------------------------
+        # Save (if save_to is provided)
+        # ----------------------------------------------------------
+        if args.save_to is not None:
+            os.makedirs(args.save_to, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = os.path.join(args.save_to, f"sweep_{timestamp}.json")
+            with open(filepath, "w") as f:
+                json.dump({"args": vars(args),
+                           "summary": summary,
+                           "aggregate": aggregator.summary(),
+                           "usage": usage_log,
+                           "episodes": episodes}, f, indent=2)
+            print(f"\nSweep saved to {filepath}")
+
+if __name__ == "__main__":
+    main()
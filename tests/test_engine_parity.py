@@ -0,0 +1,8 @@
+from bargain_langgraph.graph.parity import check_engine_parity
+"""
+The native engine must reproduce the LangGraph executor's final states
+(see bargain_langgraph/graph/parity.py for the cases)
+"""
+
+def test_engine_parity():
+    assert check_engine_parity() == []